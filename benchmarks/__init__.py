@@ -0,0 +1,11 @@
+"""
+Benchmarks for the data lab pipelines.
+
+synthetic.py generates seeded stand-ins for the proprietary CEPII gravity
+panel and for WDI Excel extracts at configurable scale, so every pipeline can
+be timed without the original files. bench.py holds asv-style benchmark
+classes (setup() plus time_* methods); run them with
+
+    py -m benchmarks --scale small            # time and compare to baselines.json
+    py -m benchmarks --scale small --save     # record new baselines
+"""
@@ -0,0 +1,114 @@
+"""
+Run the benchmarks and compare against stored baselines.
+
+    py -m benchmarks [--scale small] [-k fe] [--repeat 5] [--save] [--tolerance 0.5]
+
+Each time_* method is run once to warm up, then `--repeat` times; the median
+is compared with baselines.json. A benchmark slower than
+baseline * (1 + tolerance) is reported as a regression and the exit code is 1.
+--save records the current medians as the new baselines for that scale.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks.bench import BENCHMARKS
+from benchmarks.synthetic import SCALES
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+
+def run_benchmark(cls, scale, repeat, pattern):
+    """Time every matching time_* method of `cls`; returns {name: [seconds, ...]}"""
+    methods = [m for m in dir(cls) if m.startswith('time_')
+               and (not pattern or pattern in f'{cls.__name__}.{m}')]
+    if not methods:
+        return {}
+
+    bench = cls()
+    results = {}
+    quiet = io.StringIO()
+    with contextlib.redirect_stdout(quiet):
+        bench.setup(scale)
+    try:
+        for method in methods:
+            func = getattr(bench, method)
+            times = []
+            with contextlib.redirect_stdout(quiet):
+                func(scale)  # warm-up
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    func(scale)
+                    times.append(time.perf_counter() - start)
+            results[f'{cls.__name__}.{method}'] = times
+            quiet.seek(0)
+            quiet.truncate()
+    finally:
+        if hasattr(bench, 'teardown'):
+            bench.teardown(scale)
+    return results
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the data lab benchmarks')
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('-k', dest='pattern', help='only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed slowdown over baseline before failing (0.5 = 50%%)')
+    parser.add_argument('--save', action='store_true', help='store results as the new baselines')
+    parser.add_argument('--baselines', default=BASELINES)
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baselines)
+    stored = baselines.get(args.scale, {})
+    regressions = []
+    medians = {}
+
+    print(f"{'benchmark':<45} {'median':>10} {'min':>10} {'baseline':>10}  change")
+    for cls in BENCHMARKS:
+        for name, times in run_benchmark(cls, args.scale, args.repeat, args.pattern).items():
+            median = statistics.median(times)
+            medians[name] = median
+            base = stored.get(name)
+            if base:
+                change = median / base - 1
+                flag = '  REGRESSION' if change > args.tolerance else ''
+                if flag:
+                    regressions.append(name)
+                print(f"{name:<45} {median:>9.4f}s {min(times):>9.4f}s {base:>9.4f}s  {change:+6.1%}{flag}")
+            else:
+                print(f"{name:<45} {median:>9.4f}s {min(times):>9.4f}s {'-':>10}")
+
+    if args.save:
+        baselines.setdefault(args.scale, {}).update(medians)
+        baselines['_machine'] = {'python': platform.python_version(),
+                                 'platform': platform.platform(),
+                                 'processor': platform.processor() or platform.machine()}
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nBaselines for scale '{args.scale}' saved to {args.baselines}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
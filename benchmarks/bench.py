@@ -0,0 +1,152 @@
+"""
+asv-style benchmarks: each class has setup(scale) and time_* methods, and is
+parametrized over the synthetic data scales in synthetic.SCALES.
+
+Covered: gravity panel loading (read_stata + filter), variable construction
+(wide and normalized), pooled OLS and fixed-effect absorption (on both
+forms), the median growth-gap analysis (in memory and from Excel extracts),
+streaming ingestion of the WDI bulk CSV and the Specific Factors Model solver.
+"""
+
+import os
+import tempfile
+
+from cli import import_lab
+from benchmarks.synthetic import (SCALES, make_gravity_panel, make_wdi_sheet,
+                                  write_gravity_dta, write_wdi_bulk_csv, write_wdi_xlsx)
+
+
+class GravityLoad:
+    params = list(SCALES)
+    param_names = ['scale']
+
+    def setup(self, scale):
+        self.gravity = import_lab('datalab4', 'gravity')
+        n_countries, n_years = SCALES[scale]['gravity']
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = write_gravity_dta(os.path.join(self.tmp.name, 'gravity.dta'),
+                                      n_countries=n_countries, n_years=n_years)
+        self.df = self.gravity.load_gravity(self.path)
+
+    def teardown(self, scale):
+        self.tmp.cleanup()
+
+    def time_load(self, scale):
+        self.gravity.load_gravity(self.path)
+
+    def time_build_variables(self, scale):
+        self.gravity.build_variables(self.df.copy())
+
+    def time_build_panel(self, scale):
+        self.gravity.build_panel(self.df)
+
+
+class GravityModels:
+    params = list(SCALES)
+    param_names = ['scale']
+
+    def setup(self, scale):
+        self.gravity = import_lab('datalab4', 'gravity')
+        n_countries, n_years = SCALES[scale]['gravity']
+        panel = make_gravity_panel(n_countries=n_countries, n_years=n_years)
+        self.df = self.gravity.build_variables(panel.copy())
+        # The normalized panel is what the pipeline and CLI pass to the models
+        self.panel = self.gravity.build_panel(panel)
+
+    def time_ols(self, scale):
+        self.gravity.run_ols(self.df)
+
+    def time_fe(self, scale):
+        self.gravity.run_fe(self.df)
+
+    def time_ols_panel(self, scale):
+        self.gravity.run_ols(self.panel)
+
+    def time_fe_panel(self, scale):
+        self.gravity.run_fe(self.panel)
+
+
+class GrowthGap:
+    params = list(SCALES)
+    param_names = ['scale']
+
+    def setup(self, scale):
+        import pandas as pd
+
+        self.trade_analysis = import_lab('datalab2', 'trade_analysis')
+        self.grouped_stats = import_lab('datalab2', 'grouped_stats')
+        n_countries, n_years = SCALES[scale]['wdi']
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = {}
+        frames = []
+        for seed, (code, value) in enumerate([('NE.TRD.GNFS.ZS', 'Trade'),
+                                              ('NY.GDP.PCAP.KD.ZG', 'Growth')]):
+            kwargs = dict(n_countries=n_countries, n_years=n_years, seed=seed)
+            self.paths[value] = write_wdi_xlsx(os.path.join(self.tmp.name, f'{code}.xlsx'),
+                                               code, **kwargs)
+            wide = make_wdi_sheet(code, **kwargs).dropna(subset=['Series Code'])
+            frames.append(wide.melt(id_vars=['Series Name', 'Series Code', 'Country Name',
+                                             'Country Code'],
+                                    var_name='Year', value_name=value)
+                              .drop(columns=['Series Name', 'Series Code']))
+        self.frame = pd.merge(*frames, on=['Country Name', 'Country Code', 'Year'])
+
+    def teardown(self, scale):
+        self.tmp.cleanup()
+
+    def time_grouped_split_median(self, scale):
+        self.grouped_stats.grouped_split(self.frame, 'Trade', 'Growth', by='Year', q=2)
+
+    def time_grouped_split_deciles(self, scale):
+        self.grouped_stats.grouped_split(self.frame, 'Trade', 'Growth', by='Year', q=10)
+
+    def time_lab_median_growth_gap(self, scale):
+        from figures import FigureQueue
+
+        # Figures are queued but never rendered: this times load + analysis only
+        self.trade_analysis.lab_median_growth_gap(self.paths['Trade'], self.paths['Growth'],
+                                                  FigureQueue())
+
+
+class WDIBulk:
+    params = list(SCALES)
+    param_names = ['scale']
+    series = ['NE.TRD.GNFS.ZS', 'NY.GDP.PCAP.KD.ZG']
+
+    def setup(self, scale):
+        self.wdi_bulk = import_lab('datalab2', 'wdi_bulk')
+        n_countries, n_years = SCALES[scale]['wdi']
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = write_wdi_bulk_csv(os.path.join(self.tmp.name, 'WDICSV.csv'),
+                                       n_countries=n_countries, n_years=n_years, n_series=200)
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+        self.wdi_bulk.ingest_wdi_bulk(self.path, self.series, cache_dir=self.cache_dir)
+        self.runs = 0
+
+    def teardown(self, scale):
+        self.tmp.cleanup()
+
+    def time_ingest(self, scale):
+        # A fresh cache directory each call, so the file is always streamed
+        self.runs += 1
+        self.wdi_bulk.ingest_wdi_bulk(self.path, self.series,
+                                      cache_dir=os.path.join(self.tmp.name, f'ingest{self.runs}'))
+
+    def time_load_cached(self, scale):
+        self.wdi_bulk.load_wdi_bulk(self.path, self.series, cache_dir=self.cache_dir)
+
+
+class SFMSolve:
+    # The model size is fixed; the scale parameter is accepted for uniformity
+    params = list(SCALES)
+    param_names = ['scale']
+
+    def setup(self, scale):
+        self.sfm = import_lab('datalab3', 'sfm_notebook')
+
+    def time_solve_scenario(self, scale):
+        self.sfm.solve_scenario(1.0)
+        self.sfm.solve_scenario(1.2)
+
+
+BENCHMARKS = [GravityLoad, GravityModels, GrowthGap, WDIBulk, SFMSolve]
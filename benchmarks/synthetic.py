@@ -0,0 +1,188 @@
+"""
+Seeded synthetic data with the same schema as the lab inputs.
+
+- make_gravity_panel: CEPII Gravity_V202102-style dyad/year panel (iso3_o,
+  iso3_d, year, distw, contig, comlang_off, comrelig, col_dep_ever,
+  transition_legalchange, country_exists_o/_d, tradeflow_comtrade_d with
+  zeros and missing flows). Flows follow a gravity equation, so regressions
+  recover sensible coefficients.
+- make_wdi_sheet: WDI "Data" sheet in wide format (one row per country,
+  one "1990 [YR1990]" column per year, blank and footnote rows at the end).
+- make_wdi_bulk: WDI bulk CSV layout (one row per country and indicator,
+  one "1990" column per year) holding the sheets above plus filler series.
+
+Same seed and arguments always give the same data.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Rows of the real gravity panel: ~252 countries x 251 partners x 70 years = 4.4M
+SCALES = {
+    'small':  {'gravity': (30, 10),  'wdi': (60, 35)},
+    'medium': {'gravity': (100, 20), 'wdi': (217, 35)},
+    'large':  {'gravity': (200, 25), 'wdi': (217, 64)},
+    'full':   {'gravity': (252, 70), 'wdi': (266, 64)},
+}
+
+
+def iso3_codes(n):
+    """n distinct three-letter codes: AAA, AAB, ..."""
+    i = np.arange(n)
+    letters = np.stack([i // 676 % 26, i // 26 % 26, i % 26], axis=1) + ord('A')
+    return np.array([''.join(map(chr, row)) for row in letters])
+
+
+def make_gravity_panel(n_countries=30, n_years=10, first_year=2000, zero_share=0.1,
+                       missing_share=0.05, seed=0):
+    """
+    Dyad/year gravity panel for `n_countries` (all ordered pairs, o != d)
+    over `n_years` years, i.e. n*(n-1)*n_years rows.
+    """
+    rng = np.random.default_rng(seed)
+    iso = iso3_codes(n_countries)
+
+    # Country attributes: location, language/religion/colonizer groups, size
+    lat = np.radians(rng.uniform(-50, 65, n_countries))
+    lon = np.radians(rng.uniform(-180, 180, n_countries))
+    language = rng.integers(0, 8, n_countries)
+    religion = rng.integers(0, 5, n_countries)
+    colonizer = np.where(rng.random(n_countries) < 0.5, rng.integers(0, 6, n_countries), -1)
+    exporter = rng.normal(0, 1.5, n_countries)
+    importer = rng.normal(0, 1.5, n_countries)
+    exists = rng.random(n_countries) > 0.03
+
+    # Ordered pairs and their time-invariant covariates
+    o, d = np.nonzero(~np.eye(n_countries, dtype=bool))
+    central = np.arccos(np.clip(np.sin(lat[o]) * np.sin(lat[d])
+                                + np.cos(lat[o]) * np.cos(lat[d]) * np.cos(lon[o] - lon[d]), -1, 1))
+    distw = np.maximum(6371.0 * central, 50.0)
+    contig = (distw < 1200).astype(np.int8)
+    comlang_off = (language[o] == language[d]).astype(np.int8)
+    comrelig = (religion[o] == religion[d]).astype(np.int8)
+    col_dep_ever = ((colonizer[o] == colonizer[d]) & (colonizer[o] >= 0)).astype(np.int8)
+
+    # Stack years: every dyad once per year
+    n_pairs = len(o)
+    years = np.repeat(np.arange(first_year, first_year + n_years, dtype=np.int16), n_pairs)
+    oo, dd = np.tile(o, n_years), np.tile(d, n_years)
+    t = years - first_year
+
+    lnflow = (8 + exporter[oo] + importer[dd] + 0.02 * t
+              - 1.0 * np.log(np.tile(distw, n_years))
+              + 0.4 * np.tile(comlang_off, n_years) + 0.2 * np.tile(comrelig, n_years)
+              + 0.5 * np.tile(col_dep_ever, n_years) + 0.6 * np.tile(contig, n_years)
+              + rng.normal(0, 1.2, len(years)))
+    flow = np.exp(lnflow)
+    u = rng.random(len(years))
+    flow[u < zero_share] = 0.0
+    flow[(u >= zero_share) & (u < zero_share + missing_share)] = np.nan
+
+    return pd.DataFrame({
+        'year': years,
+        'iso3_o': iso[oo],
+        'iso3_d': iso[dd],
+        'country_exists_o': exists[oo].astype(np.int8),
+        'country_exists_d': exists[dd].astype(np.int8),
+        'distw': np.tile(distw, n_years),
+        'contig': np.tile(contig, n_years),
+        'comlang_off': np.tile(comlang_off, n_years),
+        'comrelig': np.tile(comrelig, n_years),
+        'col_dep_ever': np.tile(col_dep_ever, n_years),
+        'transition_legalchange': (rng.random(len(years)) < 0.02).astype(np.int8),
+        'tradeflow_comtrade_d': flow,
+    })
+
+
+WDI_SERIES = {
+    'NE.TRD.GNFS.ZS': ('Trade (% of GDP)', 'lognormal', (4.3, 0.5)),
+    'NY.GDP.PCAP.KD.ZG': ('GDP per capita growth (annual %)', 'normal', (2.0, 4.0)),
+}
+
+
+def make_wdi_sheet(series_code='NE.TRD.GNFS.ZS', n_countries=60, n_years=35, first_year=1990,
+                   missing_share=0.1, seed=0):
+    """WDI 'Data' sheet for one series in wide format, as exported from DataBank"""
+    rng = np.random.default_rng(seed)
+    series_name, dist, (a, b) = WDI_SERIES[series_code]
+    iso = iso3_codes(n_countries)
+
+    # Persistent country level plus yearly noise
+    level = rng.normal(0, 1, (n_countries, 1))
+    shocks = rng.normal(0, 1, (n_countries, n_years))
+    if dist == 'lognormal':
+        values = np.exp(a + b * (0.8 * level + 0.3 * shocks))
+    else:
+        values = a + b * (0.3 * level + shocks)
+    values[rng.random(values.shape) < missing_share] = np.nan
+
+    years = range(first_year, first_year + n_years)
+    sheet = pd.DataFrame(values, columns=[f'{y} [YR{y}]' for y in years])
+    sheet.insert(0, 'Series Name', series_name)
+    sheet.insert(1, 'Series Code', series_code)
+    sheet.insert(2, 'Country Name', [f'Country {code}' for code in iso])
+    sheet.insert(3, 'Country Code', iso)
+
+    # DataBank exports end with blank rows and source notes
+    footer = pd.DataFrame({'Series Name': [np.nan, np.nan, 'Data from database: World Development Indicators',
+                                           'Last Updated: 01/01/2025']})
+    return pd.concat([sheet, footer], ignore_index=True)
+
+
+def make_wdi_bulk(n_countries=60, n_years=35, first_year=1990, n_series=50, seeds=(0, 1),
+                  aggregates=('WLD', 'HIC')):
+    """
+    WDI bulk-download frame: the WDI_SERIES sheets (seeded as in
+    make_wdi_sheet, so results match the Excel extracts) plus filler
+    indicators up to `n_series`, sorted by country then indicator. Rows for
+    the `aggregates` codes (country averages) are appended, as in the real
+    file, which the Excel extracts do not contain.
+    """
+    years = [str(y) for y in range(first_year, first_year + n_years)]
+    parts = []
+    for code, seed in zip(WDI_SERIES, seeds):
+        sheet = make_wdi_sheet(code, n_countries, n_years, first_year, seed=seed)
+        sheet = sheet.dropna(subset=['Series Code'])
+        sheet.columns = list(sheet.columns[:4]) + years
+        parts.append(sheet)
+
+    rng = np.random.default_rng(len(seeds))
+    iso = iso3_codes(n_countries)
+    for i in range(max(n_series - len(parts), 0)):
+        filler = pd.DataFrame(rng.normal(50, 20, (n_countries, n_years)), columns=years)
+        filler.insert(0, 'Series Name', f'Synthetic indicator {i}')
+        filler.insert(1, 'Series Code', f'SYN.{i:04d}')
+        filler.insert(2, 'Country Name', [f'Country {code}' for code in iso])
+        filler.insert(3, 'Country Code', iso)
+        parts.append(filler)
+
+    # Aggregates: the mean over countries of every indicator
+    means = [part.groupby('Series Code', sort=False)[years].mean().reset_index() for part in parts]
+    for code in aggregates:
+        for mean in means:
+            rows = mean.assign(**{'Series Name': mean['Series Code'], 'Country Name': f'Aggregate {code}',
+                                  'Country Code': code})
+            parts.append(rows[['Series Name', 'Series Code', 'Country Name', 'Country Code'] + years])
+
+    bulk = pd.concat(parts, ignore_index=True)
+    bulk = bulk.rename(columns={'Series Name': 'Indicator Name', 'Series Code': 'Indicator Code'})
+    bulk = bulk[['Country Name', 'Country Code', 'Indicator Name', 'Indicator Code'] + years]
+    return bulk.sort_values(['Country Code', 'Indicator Code'], ignore_index=True)
+
+
+def write_gravity_dta(path, **kwargs):
+    """Write a synthetic gravity panel to a Stata file (what gravity.py reads)"""
+    make_gravity_panel(**kwargs).to_stata(path, write_index=False)
+    return path
+
+
+def write_wdi_xlsx(path, series_code, **kwargs):
+    """Write a synthetic WDI extract to an .xlsx with a 'Data' sheet"""
+    make_wdi_sheet(series_code, **kwargs).to_excel(path, sheet_name='Data', index=False)
+    return path
+
+
+def write_wdi_bulk_csv(path, **kwargs):
+    """Write a synthetic WDI bulk download (WDICSV.csv layout)"""
+    make_wdi_bulk(**kwargs).to_csv(path, index=False)
+    return path
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Start-up regression check for the CLI, based on `python -X importtime`.
+
+Runs each quick command in a fresh interpreter with -X importtime, parses the
+import log from stderr and fails (exit code 1) if
+- a module that command should never load is imported (e.g. matplotlib for
+  `sfm solve`), or
+- the total cumulative import time exceeds the command's budget.
+
+    py check_importtime.py            # check all commands
+    py check_importtime.py --verbose  # also list the slowest imports
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY = ['numpy', 'pandas', 'matplotlib', 'seaborn', 'statsmodels', 'linearmodels', 'scipy']
+
+# command -> (import-time budget in ms, modules that must not be imported)
+CHECKS = {
+    'sfm solve': (300, HEAVY),
+    '--help': (200, HEAVY),
+}
+
+
+def import_times(command):
+    """Run `cli.py <command>` with -X importtime; returns [(module, cumulative_us)] for top-level imports"""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(ROOT, 'cli.py')] + command.split(),
+        capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"'cli.py {command}' failed:\n{proc.stderr}")
+
+    times = []
+    for line in proc.stderr.splitlines():
+        # import time:      self [us] |  cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.append((name.rstrip(), int(cumulative)))
+    return times
+
+
+def check(command, budget_ms, forbidden, verbose=False):
+    """Return a list of problems for one command (empty if it passes)"""
+    times = import_times(command)
+    problems = []
+
+    loaded = {name.strip().split('.')[0] for name, _ in times}
+    for module in forbidden:
+        if module in loaded:
+            problems.append(f"'{command}' imports {module}")
+
+    # Top-level imports are the unindented entries; their cumulative times add up to the total
+    top = [(name.strip(), us) for name, us in times if not name.startswith('  ')]
+    total_ms = sum(us for _, us in top) / 1000
+    if total_ms > budget_ms:
+        problems.append(f"'{command}' spends {total_ms:.0f} ms importing (budget {budget_ms} ms)")
+
+    print(f"{command:<12} {total_ms:7.1f} ms  (budget {budget_ms} ms)")
+    if verbose:
+        for name, us in sorted(top, key=lambda t: -t[1])[:10]:
+            print(f"    {us / 1000:7.1f} ms  {name}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--verbose', action='store_true', help='list the slowest imports')
+    args = parser.parse_args()
+
+    problems = []
+    for command, (budget_ms, forbidden) in CHECKS.items():
+        problems += check(command, budget_ms, forbidden, args.verbose)
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the ECON 2181 data labs.
+
+    py cli.py sfm solve [--zm 1.2]           # one SFM equilibrium, no plotting libs
+    py cli.py sfm run                        # full Data Lab 3 (plots included)
+    py cli.py gravity ols [--data FILE]      # pooled OLS gravity regressions
+    py cli.py gravity fe [--data FILE]       # origin/destination fixed effects model
+    py cli.py gravity run [--data FILE]      # full Data Lab 4 pipeline (cached stages)
+    py cli.py gravity update --data NEW.dta [--state FILE] [--years 2019 ...]  # fold in new years
+    py cli.py gravity export [--data FILE] [--out gravity_arrays.bin]  # shared memory-mapped arrays
+    py cli.py gravity years [--arrays gravity_arrays.bin] [--workers N]  # per-year OLS in processes
+    py cli.py wdi gap TRADE.xlsx GROWTH.xlsx [--dpi 300] [--format png]
+    py cli.py wdi bulk WDICSV.csv [--countries USA CHN ...]  # same analysis, streamed bulk CSV
+    py cli.py --profile <command>            # stage timing/memory trace (see profiling.py)
+
+This module only imports the standard library. Each subcommand imports the
+lab module (and with it pandas, statsmodels, matplotlib, ...) when it runs,
+so quick commands such as `sfm solve` start fast. check_importtime.py guards
+that start-up cost.
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_lab(directory, module):
+    """Import a lab script from its datalab directory"""
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return __import__(module)
+
+
+# ----------------------------------------------------------------------- sfm
+
+def sfm_solve(args):
+    """Solve the Specific Factors Model for one value of Z_M and print it"""
+    sfm = import_lab('datalab3', 'sfm_notebook')
+    eq = sfm.solve_scenario(args.zm)
+    print(f"Z_M = {args.zm}")
+    print(f"Equilibrium relative price (P_M/P_A): {eq['p_star']:.6f}")
+    for i, name in [('H', 'Home'), ('F', 'Foreign')]:
+        print(f"\n{name}:")
+        print(f"  w     = {eq['w'][i]:.6f}")
+        print(f"  Y_M   = {eq['Ym'][i]:.6f}   Y_A = {eq['Ya'][i]:.6f}")
+        print(f"  L_M   = {eq['Lm'][i]:.6f}   L_A = {eq['La'][i]:.6f}")
+
+
+def sfm_run(args):
+    """Run the whole Data Lab 3 notebook"""
+    import_lab('datalab3', 'sfm_notebook').main()
+
+
+# ------------------------------------------------------------------- gravity
+
+def _gravity_frame(gravity, args):
+    return gravity.build_panel(gravity.load_gravity(args.data or gravity.data))
+
+
+def gravity_ols(args):
+    """Pooled OLS gravity regressions"""
+    gravity = import_lab('datalab4', 'gravity')
+    gravity.report(ols=gravity.run_ols(_gravity_frame(gravity, args)))
+
+
+def gravity_fe(args):
+    """Gravity regression with origin and destination fixed effects absorbed"""
+    gravity = import_lab('datalab4', 'gravity')
+    gravity.report(fe=gravity.run_fe(_gravity_frame(gravity, args)))
+
+
+def gravity_run(args):
+    """Full Data Lab 4 pipeline, reusing cached stages"""
+    gravity = import_lab('datalab4', 'gravity')
+    pipe = gravity.build_pipeline(args.data or gravity.data)
+    pipe.run(force=True if args.force else ())
+
+
+def gravity_update(args):
+    """Update the stored OLS/FE estimates with the years in a new release"""
+    gravity = import_lab('datalab4', 'gravity')
+    state = gravity.update_estimates(args.data or gravity.data, args.state, revise=args.years or ())
+    print(state.summary())
+
+
+def gravity_export(args):
+    """Write the regressors to a memory-mapped store that worker processes can share"""
+    gravity = import_lab('datalab4', 'gravity')
+    gravity_arrays = import_lab('datalab4', 'gravity_arrays')
+    gravity_arrays.export_arrays(_gravity_frame(gravity, args), args.out)
+    print(f"Arrays written to {args.out}")
+
+
+def gravity_years(args):
+    """Year-by-year OLS, workers attaching to an exported store"""
+    gravity_arrays = import_lab('datalab4', 'gravity_arrays')
+    print(gravity_arrays.ols_by_year(args.arrays, max_workers=args.workers).to_string())
+
+
+# ----------------------------------------------------------------------- wdi
+
+def wdi_gap(args):
+    """Median growth-gap analysis on WDI Trade and GDP per capita growth extracts"""
+    trade_analysis = import_lab('datalab2', 'trade_analysis')
+    from figures import FigureQueue
+
+    queue = FigureQueue(dpi=args.dpi, fmt=args.format)
+    pivot = trade_analysis.lab_median_growth_gap(args.trade, args.growth, queue)
+    queue.render()
+    if pivot is None:
+        return 1
+
+
+def wdi_bulk(args):
+    """Median growth-gap analysis on the full WDI bulk CSV, streamed into a cache"""
+    trade_analysis = import_lab('datalab2', 'trade_analysis')
+    from figures import FigureQueue
+
+    queue = FigureQueue(dpi=args.dpi, fmt=args.format)
+    pivot = trade_analysis.lab_median_growth_gap_bulk(args.csv, queue, countries=args.countries,
+                                                      cache_dir=args.cache_dir,
+                                                      aggregates=args.include_aggregates)
+    queue.render()
+    if pivot is None:
+        return 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='ECON 2181 data labs')
+    parser.add_argument('--profile', action='store_true',
+                        help='record stage timings/memory and print a summary at exit')
+    parser.add_argument('--profile-out', default='profile_trace', metavar='PREFIX',
+                        help='trace files written by --profile (default profile_trace.json/.csv)')
+    labs = parser.add_subparsers(dest='lab', required=True)
+
+    sfm = labs.add_parser('sfm', help='Data Lab 3: Specific Factors Model')
+    sfm_cmds = sfm.add_subparsers(dest='command', required=True)
+    p = sfm_cmds.add_parser('solve', help='solve one equilibrium')
+    p.add_argument('--zm', type=float, default=1.0,
+                   help='manufacturing productivity Z_M in both countries (default 1.0)')
+    p.set_defaults(func=sfm_solve)
+    p = sfm_cmds.add_parser('run', help='run the full lab with plots')
+    p.set_defaults(func=sfm_run)
+
+    gravity = labs.add_parser('gravity', help='Data Lab 4: gravity regressions')
+    gravity_cmds = gravity.add_subparsers(dest='command', required=True)
+    for name, func, help_text in [('ols', gravity_ols, 'pooled OLS regressions'),
+                                  ('fe', gravity_fe, 'fixed-effects regression'),
+                                  ('run', gravity_run, 'full cached pipeline'),
+                                  ('update', gravity_update, 'update estimates with new years'),
+                                  ('export', gravity_export, 'export shared memory-mapped arrays')]:
+        p = gravity_cmds.add_parser(name, help=help_text)
+        p.add_argument('--data', help='path to Gravity_V202102.dta')
+        p.set_defaults(func=func)
+    gravity_cmds.choices['run'].add_argument('--force', action='store_true',
+                                             help='ignore cached stages')
+    gravity_cmds.choices['update'].add_argument('--state', default='gravity_state.pkl',
+                                                help='estimator state file (default gravity_state.pkl)')
+    gravity_cmds.choices['update'].add_argument('--years', type=int, nargs='+', metavar='YEAR',
+                                                help='also recompute these already stored years (revisions)')
+    gravity_cmds.choices['export'].add_argument('--out', default='gravity_arrays.bin',
+                                                help='array store to write (default gravity_arrays.bin)')
+    p = gravity_cmds.add_parser('years', help='per-year OLS on an exported array store')
+    p.add_argument('--arrays', default='gravity_arrays.bin', help='store written by `gravity export`')
+    p.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    p.set_defaults(func=gravity_years)
+
+    wdi = labs.add_parser('wdi', help='Data Lab 2: World Development Indicators')
+    wdi_cmds = wdi.add_subparsers(dest='command', required=True)
+    p = wdi_cmds.add_parser('gap', help='median growth-gap analysis')
+    p.add_argument('trade', help='WDI Trade (% of GDP) extract (.xlsx)')
+    p.add_argument('growth', help='WDI GDP per capita growth extract (.xlsx)')
+    p.add_argument('--dpi', type=int, default=300)
+    p.add_argument('--format', default='png', help='figure format (png, svg, pdf, ...)')
+    p.set_defaults(func=wdi_gap)
+    p = wdi_cmds.add_parser('bulk', help='median growth-gap analysis from the WDI bulk CSV')
+    p.add_argument('csv', help='WDI bulk download (WDICSV.csv or WDIData.csv)')
+    p.add_argument('--countries', nargs='+', metavar='ISO3', help='keep only these country codes')
+    p.add_argument('--include-aggregates', action='store_true',
+                   help='keep regional/income aggregates (WLD, HIC, ...), dropped by default')
+    p.add_argument('--cache-dir', default='.wdi_cache', help='columnar cache (default .wdi_cache)')
+    p.add_argument('--dpi', type=int, default=300)
+    p.add_argument('--format', default='png', help='figure format (png, svg, pdf, ...)')
+    p.set_defaults(func=wdi_bulk)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        import profiling
+        profiling.enable(args.profile_out)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
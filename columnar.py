@@ -0,0 +1,138 @@
+"""
+Minimal on-disk columnar cache for long-format lab data.
+
+A cache is a directory with one raw binary file per column and a meta.json
+describing them. String columns are dictionary-encoded (int32 codes plus a
+category list in meta.json); numeric columns are stored as-is. Frames are
+appended chunk by chunk, so a writer never holds more than one chunk:
+
+    with ColumnarWriter('.wdi_cache/abc123', meta={'source': ...}) as out:
+        for chunk in chunks:
+            out.append(chunk)
+    df = read_columnar('.wdi_cache/abc123', columns=['Country Code', 'Value'])
+
+The directory is written under a temporary name and renamed when the writer
+closes, so a half-written cache is never read. String columns come back as
+pandas Categoricals.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+META = 'meta.json'
+
+
+def _filename(column):
+    # Column names such as 'Country Code' are fine on disk; path separators are not
+    return column.replace('/', '_').replace('\\', '_') + '.bin'
+
+
+class ColumnarWriter:
+    """Append DataFrame chunks with a fixed set of columns to a cache directory"""
+
+    def __init__(self, directory, meta=None):
+        self.directory = directory
+        self.tmp = f'{directory}.{os.getpid()}.tmp'
+        self.meta = dict(meta or {})
+        self.columns = None
+        self.rows = 0
+        self._files = {}
+        self._categories = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _start(self, frame):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self.columns = {}
+        for name, dtype in frame.dtypes.items():
+            if pd.api.types.is_numeric_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype):
+                self.columns[name] = {'dtype': np.dtype(dtype).str}
+            else:
+                self.columns[name] = {'dtype': np.dtype(np.int32).str, 'categories': []}
+                self._categories[name] = {}
+            self._files[name] = open(os.path.join(self.tmp, _filename(name)), 'wb')
+
+    def _encode(self, name, values):
+        """Codes for a string column, extending its category list"""
+        lookup = self._categories[name]
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        mapping = np.empty(len(uniques) + 1, dtype=np.int32)
+        mapping[-1] = -1  # factorize's NA code -1 indexes the last slot
+        for i, value in enumerate(uniques):
+            value = str(value)
+            if value not in lookup:
+                lookup[value] = len(lookup)
+                self.columns[name]['categories'].append(value)
+            mapping[i] = lookup[value]
+        return mapping[codes]
+
+    def append(self, frame):
+        """Write one chunk; its columns must match the first chunk's"""
+        if self.columns is None:
+            self._start(frame)
+        elif list(frame.columns) != list(self.columns):
+            raise ValueError(f"chunk columns {list(frame.columns)} do not match {list(self.columns)}")
+        for name, spec in self.columns.items():
+            if 'categories' in spec:
+                values = self._encode(name, frame[name].to_numpy(dtype=object))
+            else:
+                values = np.ascontiguousarray(frame[name].to_numpy(), dtype=spec['dtype'])
+            self._files[name].write(memoryview(values).cast('B'))
+        self.rows += len(frame)
+
+    def close(self):
+        """Finish the cache and move it into place"""
+        if self.columns is None:
+            # Nothing was appended: an empty cache without columns
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            os.makedirs(self.tmp)
+            self.columns = {}
+        for f in self._files.values():
+            f.close()
+        with open(os.path.join(self.tmp, META), 'w') as f:
+            json.dump(dict(self.meta, rows=self.rows, columns=self.columns), f)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self.tmp, self.directory)
+
+    def abort(self):
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def columnar_meta(directory):
+    """meta.json of a finished cache, or None if there is none"""
+    try:
+        with open(os.path.join(directory, META)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_columnar(directory, columns=None):
+    """Load `columns` (default all) of a cache as a DataFrame"""
+    meta = columnar_meta(directory)
+    if meta is None:
+        raise FileNotFoundError(f"no columnar cache in {directory}")
+    names = list(meta['columns']) if columns is None else list(columns)
+    data = {}
+    for name in names:
+        spec = meta['columns'][name]
+        values = np.fromfile(os.path.join(directory, _filename(name)), dtype=spec['dtype'])
+        if 'categories' in spec:
+            values = pd.Categorical.from_codes(values, spec['categories'])
+        data[name] = values
+    return pd.DataFrame(data)
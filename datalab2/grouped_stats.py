@@ -0,0 +1,123 @@
+"""
+Grouped quantile-split statistics for WDI panels.
+
+Generalizes the above/below median step of the Data Lab 2 growth-gap analysis:
+within each group (e.g. each Year) rows are split into quantile bins of an
+indicator (median, terciles, deciles, ...) and the outcome is averaged per bin.
+Everything is done in one sort over integer-coded groups, so the same call
+scales to the full WDI panel and to many indicator/outcome pairs.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def default_labels(q):
+    """Bin labels used when none are given: median split, terciles, or Q1..Qq"""
+    if q == 2:
+        return ['Below Median', 'Above Median']
+    if q == 3:
+        return ['Bottom Tercile', 'Middle Tercile', 'Top Tercile']
+    return [f'Q{k}' for k in range(1, q + 1)]
+
+
+def quantile_bins(codes, values, n_groups, q):
+    """
+    Assign each row to a quantile bin of `values` within its group.
+
+    `codes` are integer group codes in [0, n_groups). Rows are sorted once by
+    (group, value); the k/q quantile of every group is then read off the sorted
+    array with linear interpolation (same rule as pandas' median/quantile).
+    A row goes to bin b when it is strictly above b of the q-1 cut points, so
+    for q=2 this is exactly `value > median`.
+    """
+    order = np.lexsort((values, codes))
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    nonempty = sizes > 0
+
+    bins_sorted = np.zeros(len(values), dtype=np.int64)
+    for k in range(1, q):
+        h = (sizes - 1) * (k / q)
+        lo = np.floor(h).astype(np.int64)
+        hi = np.minimum(lo + 1, sizes - 1)
+        frac = h - lo
+        cut = np.full(n_groups, np.nan)
+        cut[nonempty] = (sorted_values[starts[nonempty] + lo[nonempty]] * (1 - frac[nonempty])
+                         + sorted_values[starts[nonempty] + hi[nonempty]] * frac[nonempty])
+        bins_sorted += sorted_values > cut[sorted_codes]
+
+    bins = np.empty_like(bins_sorted)
+    bins[order] = bins_sorted
+    return bins
+
+
+def grouped_split(frame, indicator, outcome, by='Year', q=2, weights=None, labels=None):
+    """
+    Quantile-split `frame` on `indicator` within each `by` group and average `outcome`.
+
+    Parameters:
+    - indicator: column used to form the split (e.g. 'Trade')
+    - outcome: column, or list of columns, to average per bin (e.g. 'Growth')
+    - by: grouping key, a column name or list of column names (default 'Year')
+    - q: number of quantile bins (2 = median, 3 = terciles, 10 = deciles)
+    - weights: optional column of weights for weighted means
+    - labels: optional list of q bin labels
+
+    Returns (means, counts): `means` is indexed by group with one column per
+    bin (a (outcome, bin) MultiIndex when several outcomes are passed);
+    `counts` holds the number of rows in each bin. Empty bins are NaN / 0.
+    """
+    if q < 2:
+        raise ValueError("q must be at least 2")
+    labels = list(labels) if labels is not None else default_labels(q)
+    if len(labels) != q:
+        raise ValueError(f"Expected {q} labels, got {len(labels)}")
+
+    outcomes = [outcome] if isinstance(outcome, str) else list(outcome)
+    keys = [by] if isinstance(by, str) else list(by)
+
+    needed = keys + [indicator] + outcomes + ([weights] if weights is not None else [])
+    data = frame.dropna(subset=needed)
+
+    # Integer-code the groups once; sort=True keeps the output ordered by key
+    if len(keys) == 1:
+        codes, uniques = pd.factorize(data[keys[0]], sort=True)
+        index = pd.Index(uniques, name=keys[0])
+    else:
+        index = pd.MultiIndex.from_frame(data[keys]).unique().sort_values()
+        codes = index.get_indexer(pd.MultiIndex.from_frame(data[keys]))
+    codes = np.asarray(codes, dtype=np.int64)
+    n_groups = len(index)
+
+    bins = quantile_bins(codes, data[indicator].to_numpy(dtype=float), n_groups, q)
+    cell = codes * q + bins
+    n_cells = n_groups * q
+
+    counts = np.bincount(cell, minlength=n_cells).reshape(n_groups, q)
+    if weights is None:
+        w = None
+        denom = counts.astype(float)
+    else:
+        w = data[weights].to_numpy(dtype=float)
+        denom = np.bincount(cell, weights=w, minlength=n_cells).reshape(n_groups, q)
+
+    columns = pd.Index(labels, name='group')
+    blocks = []
+    for name in outcomes:
+        y = data[name].to_numpy(dtype=float)
+        sums = np.bincount(cell, weights=y if w is None else y * w,
+                           minlength=n_cells).reshape(n_groups, q)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(denom > 0, sums / denom, np.nan)
+        blocks.append(pd.DataFrame(mean, index=index, columns=columns))
+
+    if isinstance(outcome, str):
+        means = blocks[0]
+    else:
+        means = pd.concat(blocks, axis=1, keys=outcomes, names=['outcome', 'group'])
+
+    return means, pd.DataFrame(counts, index=index, columns=columns)
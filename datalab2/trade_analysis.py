@@ -5,14 +5,22 @@ Analysis of Trade (% of GDP) data for United States and China
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 import os
+import sys
 
-# Set non-interactive backend at the start
-import matplotlib
-matplotlib.use('Agg')
+from grouped_stats import grouped_split
 
+# Shared helpers (figure queue) live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from figures import FigureQueue
+from pipeline import Pipeline, File
+from profiling import stage, profiled
+
+# matplotlib is imported inside the plot functions (the figure queue sets the
+# non-interactive Agg backend), so data-only steps do not load it
+
+@profiled('wdi.import')
 def import_and_explore_data(filename):
     """Import Excel file and explore its structure"""
     print("Importing Excel file and exploring structure...")
@@ -27,6 +35,7 @@ def import_and_explore_data(filename):
     
     return df
 
+@profiled('wdi.transform')
 def transform_data(df):
     """Transform data to long format with proper filtering"""
     print("\nTransforming data to long format...")
@@ -108,12 +117,11 @@ def transform_data(df):
     
     return df_long
 
-def create_plot(df_long):
-    """Create matplotlib line chart"""
-    print("\nCreating visualization...")
-    
-    # Set up the plot (backend already set globally)
-    plt.figure(figsize=(12, 8))
+def plot_trade_comparison(df_long):
+    """Draw the USA vs China trade line chart and return the figure"""
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(12, 8))
     
     # Plot lines for each country
     for country in df_long['country'].unique():
@@ -135,13 +143,22 @@ def create_plot(df_long):
     
     # Add some padding
     plt.tight_layout()
+    return fig
+
+def create_plot(df_long, queue=None):
+    """
+    Create matplotlib line chart.
+    If a FigureQueue is given the chart is only queued; otherwise it is rendered now.
+    """
+    print("\nCreating visualization...")
     
-    # Save the plot
-    plt.savefig('trade_comparison_usa_china.png', dpi=300, bbox_inches='tight')
-    print("Plot saved as 'trade_comparison_usa_china.png'")
-    
-    # Don't show plot in interactive mode since we're saving it
-    # plt.show()  # Commented out to prevent hanging in non-GUI environments
+    render_now = queue is None
+    if render_now:
+        queue = FigureQueue()
+    queue.add(plot_trade_comparison, df_long, 'trade_comparison_usa_china.png',
+              bbox_inches='tight')
+    if render_now:
+        queue.render()
 
 def save_to_csv(df_long):
     """Save transformed dataset as CSV"""
@@ -149,15 +166,47 @@ def save_to_csv(df_long):
     df_long.to_csv('trade_data_usa_china_long.csv', index=False)
     print("Data saved as 'trade_data_usa_china_long.csv'")
 
-def lab_median_growth_gap(trade_xlsx_path, growth_xlsx_path):
+def plot_growth_gap(pivot):
+    """Draw the growth-gap difference series with mean and zero lines"""
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(12, 8))
+    
+    # Main difference line
+    plt.plot(pivot.index, pivot['difference'], marker='o', linewidth=2, 
+             label='Growth Gap (Above - Below Median Trade)', color='blue')
+    
+    # Mean line
+    plt.axhline(pivot['difference'].mean(), linewidth=2, linestyle='--', 
+                color='red', alpha=0.7, label=f'Mean Gap ({pivot["difference"].mean():.2f} pp)')
+    
+    # Zero line
+    plt.axhline(0, linewidth=1, color='black', alpha=0.5, label='Zero Gap')
+    
+    # Customize plot
+    plt.title('Difference in GDP per Capita Growth by High vs Low Trade Countries', 
+              fontsize=14, fontweight='bold')
+    plt.xlabel('Year', fontsize=12)
+    plt.ylabel('GDP per Capita Growth (percentage points)', fontsize=12)
+    plt.legend(fontsize=10)
+    plt.grid(True, linestyle='--', alpha=0.3)
+    
+    # Format x-axis
+    plt.xticks(pivot.index[::5], rotation=45)
+    
+    plt.tight_layout()
+    return fig
+
+def lab_median_growth_gap(trade_xlsx_path, growth_xlsx_path, queue=None):
     """
     Complete Data Lab 2 analysis matching the slides:
     - Load Trade and GDP per capita growth data
     - Melt both to long format
     - Merge on country/year
-    - Compute above/below median trade grouping by year
-    - Calculate average growth by group and pivot
+    - Compute above/below median trade grouping by year and average growth
+      by group (see grouped_stats.grouped_split)
     - Plot difference series with mean and zero lines
+      (queued on `queue` if given, otherwise rendered immediately)
     """
     print("\n" + "="*60)
     print("DATA LAB 2 ANALYSIS: MEDIAN GROWTH GAP")
@@ -165,9 +214,13 @@ def lab_median_growth_gap(trade_xlsx_path, growth_xlsx_path):
     
     # Load WDI Excel extracts (Data sheets)
     print("Loading Trade data...")
-    trade = pd.read_excel(trade_xlsx_path, sheet_name="Data")
+    with stage('wdi.read_excel') as s:
+        trade = pd.read_excel(trade_xlsx_path, sheet_name="Data")
+        s.rows = len(trade)
     print("Loading Growth data...")
-    growth = pd.read_excel(growth_xlsx_path, sheet_name="Data")
+    with stage('wdi.read_excel') as s:
+        growth = pd.read_excel(growth_xlsx_path, sheet_name="Data")
+        s.rows = len(growth)
 
     def tidy(df, value_name):
         """Convert WDI data to long format"""
@@ -198,33 +251,66 @@ def lab_median_growth_gap(trade_xlsx_path, growth_xlsx_path):
         return long[['Country Name','Country Code','Year', value_name]]
 
     # Convert both datasets to long format
-    trade_long = tidy(trade, 'Trade')
-    growth_long = tidy(growth, 'Growth')
+    with stage('wdi.tidy') as s:
+        trade_long = tidy(trade, 'Trade')
+        growth_long = tidy(growth, 'Growth')
+        s.rows = len(trade_long) + len(growth_long)
     
+    return median_growth_gap(trade_long, growth_long, queue)
+
+def lab_median_growth_gap_bulk(csv_path, queue=None, countries=None, cache_dir='.wdi_cache',
+                               aggregates=False):
+    """
+    The median growth-gap analysis on the full WDI bulk CSV instead of two
+    Excel extracts. The file is streamed in chunks into a columnar cache on
+    first use (see wdi_bulk.py); later runs read only the cached series.
+    Regional/income aggregates (WLD, HIC, ...) are excluded unless
+    aggregates=True or `countries` names them.
+    """
+    from wdi_bulk import load_wdi_bulk
+
+    print("\n" + "="*60)
+    print("DATA LAB 2 ANALYSIS: MEDIAN GROWTH GAP (WDI BULK CSV)")
+    print("="*60)
+
+    series = {'NE.TRD.GNFS.ZS': 'Trade', 'NY.GDP.PCAP.KD.ZG': 'Growth'}
+    long = load_wdi_bulk(csv_path, list(series), countries=countries, cache_dir=cache_dir,
+                         aggregates=aggregates)
+    if long.empty:
+        print("Warning: neither series found in the bulk file")
+        return None
+
+    frames = []
+    for code, value_name in series.items():
+        part = long[long['Series Code'] == code]
+        part = part[['Country Name', 'Country Code', 'Year', 'Value']].rename(columns={'Value': value_name})
+        part['Year'] = part['Year'].astype(int)
+        frames.append(part)
+    return median_growth_gap(*frames, queue)
+
+def median_growth_gap(trade_long, growth_long, queue=None):
+    """
+    Shared part of the growth-gap analysis: merge long Trade and Growth
+    observations on country/year, split by median trade within each year and
+    plot the growth difference. Returns the pivot table.
+    """
     print(f"Trade data: {len(trade_long)} observations")
     print(f"Growth data: {len(growth_long)} observations")
 
     # Merge on country and year
-    frame = pd.merge(trade_long, growth_long, on=['Country Name','Country Code','Year'])
-    frame = frame.dropna(subset=['Trade','Growth'])
+    with stage('wdi.merge') as s:
+        frame = pd.merge(trade_long, growth_long, on=['Country Name','Country Code','Year'])
+        frame = frame.dropna(subset=['Trade','Growth'])
+        s.rows = len(frame)
     print(f"After merge: {len(frame)} observations")
 
-    # Above/Below median trade by year
-    med = frame.groupby('Year')['Trade'].transform('median')
-    frame['group'] = (frame['Trade'] > med).map({True:'Above Median', False:'Below Median'})
-    
-    # Count countries in each group by year
-    group_counts = frame.groupby(['Year','group']).size().reset_index(name='count')
+    # Above/Below median trade by year, average growth per group (one sorted pass)
+    with stage('wdi.grouped_split', rows=len(frame)):
+        pivot, group_counts = grouped_split(frame, 'Trade', 'Growth', by='Year', q=2)
     print(f"Group distribution:\n{group_counts.head(10)}")
 
-    # Average growth by group → pivot → difference
-    result = (frame.groupby(['Year','group'])['Growth'].mean()
-                    .reset_index())
-    pivot = result.pivot(index='Year', columns='group', values='Growth')
-    pivot = pivot.sort_index()
-    
     # Calculate difference: Above Median - Below Median
-    if 'Above Median' in pivot.columns and 'Below Median' in pivot.columns:
+    if pivot['Above Median'].notna().any() and pivot['Below Median'].notna().any():
         pivot['difference'] = pivot['Above Median'] - pivot['Below Median']
     else:
         print("Warning: Both Above and Below Median groups not found")
@@ -234,33 +320,12 @@ def lab_median_growth_gap(trade_xlsx_path, growth_xlsx_path):
     print(f"Average difference: {pivot['difference'].mean():.3f} percentage points")
 
     # Plot the difference series (the slide's chart)
-    plt.figure(figsize=(12, 8))
-    
-    # Main difference line
-    plt.plot(pivot.index, pivot['difference'], marker='o', linewidth=2, 
-             label='Growth Gap (Above - Below Median Trade)', color='blue')
-    
-    # Mean line
-    plt.axhline(pivot['difference'].mean(), linewidth=2, linestyle='--', 
-                color='red', alpha=0.7, label=f'Mean Gap ({pivot["difference"].mean():.2f} pp)')
-    
-    # Zero line
-    plt.axhline(0, linewidth=1, color='black', alpha=0.5, label='Zero Gap')
-    
-    # Customize plot
-    plt.title('Difference in GDP per Capita Growth by High vs Low Trade Countries', 
-              fontsize=14, fontweight='bold')
-    plt.xlabel('Year', fontsize=12)
-    plt.ylabel('GDP per Capita Growth (percentage points)', fontsize=12)
-    plt.legend(fontsize=10)
-    plt.grid(True, linestyle='--', alpha=0.3)
-    
-    # Format x-axis
-    plt.xticks(pivot.index[::5], rotation=45)
-    
-    plt.tight_layout()
-    plt.savefig('lab_growth_gap_difference.png', dpi=300, bbox_inches='tight')
-    print("Difference plot saved as 'lab_growth_gap_difference.png'")
+    render_now = queue is None
+    if render_now:
+        queue = FigureQueue()
+    queue.add(plot_growth_gap, pivot, 'lab_growth_gap_difference.png', bbox_inches='tight')
+    if render_now:
+        queue.render()
     
     return pivot
 
@@ -285,6 +350,20 @@ relationships and understanding the shifting balance of global trade power.
     """
     print(summary)
 
+def build_pipeline(filename):
+    """
+    Stages of the trade analysis: import -> transform -> (plot, csv, summary).
+    The Excel import and transform are cached on the file's content; the
+    plot (which skips unchanged figures itself), CSV and summary always run.
+    """
+    pipe = Pipeline(max_workers=1)  # cheap stages; keep console output in order
+    pipe.add('import', import_and_explore_data, params={'filename': File(filename)})
+    pipe.add('transform', transform_data, deps=['import'])
+    pipe.add('plot', create_plot, deps=['transform'], cache=False)
+    pipe.add('csv', save_to_csv, deps=['transform'], cache=False)
+    pipe.add('summary', print_summary, cache=False)
+    return pipe
+
 def main():
     """Main function to run the complete analysis"""
     filename = 'us_china_trade_gdp_1990_2024.xlsx'
@@ -297,24 +376,17 @@ def main():
         return
     
     try:
-        # Step 1: Import and explore data
-        df = import_and_explore_data(filename)
+        pipe = build_pipeline(filename)
         
-        # Step 2: Transform data to long format
-        df_long = transform_data(df)
+        # Steps 1-2: Import, explore and transform (reused from cache if unchanged)
+        df_long = pipe.run(['transform'])['transform']
         
         if df_long is None:
             print("Data transformation failed. Please check the file structure.")
             return
         
-        # Step 3: Create visualization
-        create_plot(df_long)
-        
-        # Step 4: Save to CSV
-        save_to_csv(df_long)
-        
-        # Step 5: Print summary
-        print_summary()
+        # Steps 3-5: Visualization, CSV and summary
+        pipe.run(['plot', 'csv', 'summary'])
         
         print("\n" + "="*60)
         print("TO RUN COMPLETE DATA LAB 2 ANALYSIS:")
@@ -0,0 +1,128 @@
+"""
+Streaming ingestion of the full WDI bulk CSV download (WDICSV.csv / WDIData.csv).
+
+The bulk file has one row per country and indicator and one column per year
+("1960" ... "2023"), hundreds of MB in total. read_wdi_chunks() parses it in
+chunks of `chunksize` rows, keeps only the requested indicator codes and
+countries, melts each chunk to long format (Country Name, Country Code,
+Series Code, Year, Value) and drops missing values, so memory is bounded by
+the chunk size. Regional and income aggregates (WLD, EAS, HIC, ...) are
+left out unless asked for, so medians are taken over countries as in the
+Excel extracts. ingest_wdi_bulk() writes those chunks straight into a
+columnar cache (columnar.py) keyed on the file and the selection, and
+load_wdi_bulk() reads the cache back, ingesting first if needed:
+
+    long = load_wdi_bulk('WDICSV.csv', ['NE.TRD.GNFS.ZS', 'NY.GDP.PCAP.KD.ZG'])
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Shared helpers (columnar cache, hashing) live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from columnar import ColumnarWriter, columnar_meta, read_columnar
+from figures import data_hash
+from profiling import stage
+
+ID_COLS = ['Country Name', 'Country Code', 'Indicator Code']
+CACHE_DIR = '.wdi_cache'
+CHUNKSIZE = 20_000
+
+# Aggregate rows of the bulk file (WDICountry.csv lists them with no Region);
+# used when WDICountry.csv is not next to the bulk CSV
+AGGREGATES = frozenset([
+    'AFE', 'AFW', 'ARB', 'CEB', 'CSS', 'EAP', 'EAR', 'EAS', 'ECA', 'ECS', 'EMU',
+    'EUU', 'FCS', 'HIC', 'HPC', 'IBD', 'IBT', 'IDA', 'IDB', 'IDX', 'INX', 'LAC',
+    'LCN', 'LDC', 'LIC', 'LMC', 'LMY', 'LTE', 'MEA', 'MIC', 'MNA', 'NAC', 'OED',
+    'OSS', 'PRE', 'PSS', 'PST', 'SAS', 'SSA', 'SSF', 'SST', 'TEA', 'TEC', 'TLA',
+    'TMN', 'TSA', 'TSS', 'UMC', 'WLD',
+])
+
+
+def aggregate_codes(path):
+    """
+    Codes of the aggregate rows: those with an empty Region in the
+    WDICountry.csv shipped next to the bulk file, else AGGREGATES.
+    """
+    country_file = os.path.join(os.path.dirname(os.path.abspath(path)), 'WDICountry.csv')
+    if os.path.exists(country_file):
+        countries = pd.read_csv(country_file, usecols=['Country Code', 'Region'], dtype=str)
+        return frozenset(countries.loc[countries['Region'].isna(), 'Country Code'])
+    return AGGREGATES
+
+
+def year_columns(path, years=None):
+    """Year columns of the bulk file's header, optionally limited to (first, last)"""
+    header = pd.read_csv(path, nrows=0).columns
+    return [c for c in header if c.strip().isdigit()
+            and (years is None or years[0] <= int(c) <= years[1])]
+
+
+def read_wdi_chunks(path, series, countries=None, years=None, chunksize=CHUNKSIZE,
+                    exclude=()):
+    """
+    Yield long-format chunks of the bulk CSV for the indicator codes in
+    `series` (and the country codes in `countries`, if given), without the
+    codes in `exclude`. Only the ID columns and the selected year columns
+    are parsed.
+    """
+    series = set(series)
+    countries = None if countries is None else set(countries)
+    exclude = set(exclude)
+    year_cols = year_columns(path, years)
+    dtypes = dict({c: str for c in ID_COLS}, **{c: np.float64 for c in year_cols})
+
+    reader = pd.read_csv(path, usecols=ID_COLS + year_cols, dtype=dtypes, chunksize=chunksize)
+    for chunk in reader:
+        keep = chunk['Indicator Code'].isin(series)
+        if countries is not None:
+            keep &= chunk['Country Code'].isin(countries)
+        if exclude:
+            keep &= ~chunk['Country Code'].isin(exclude)
+        if not keep.any():
+            continue
+        long = chunk[keep].melt(id_vars=ID_COLS, value_vars=year_cols,
+                                var_name='Year', value_name='Value')
+        long = long.dropna(subset=['Value'])
+        long['Year'] = long['Year'].astype(np.int16)
+        yield long.rename(columns={'Indicator Code': 'Series Code'})
+
+
+def ingest_wdi_bulk(path, series, countries=None, years=None, cache_dir=CACHE_DIR,
+                    chunksize=CHUNKSIZE, aggregates=False):
+    """
+    Stream the selection into a columnar cache and return its directory. A
+    cache for the same file (size and mtime) and selection is reused.
+    Aggregates are dropped unless aggregates=True or `countries` is given.
+    """
+    stat = os.stat(path)
+    exclude = [] if aggregates or countries is not None else sorted(aggregate_codes(path))
+    source = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+              'series': sorted(series), 'countries': None if countries is None else sorted(countries),
+              'years': None if years is None else list(years), 'exclude': exclude}
+    directory = os.path.join(cache_dir, data_hash(source)[:16])
+    meta = columnar_meta(directory)
+    if meta is not None and meta.get('source') == source:
+        return directory
+
+    print(f"Ingesting {os.path.basename(path)} in chunks of {chunksize:,} rows...")
+    os.makedirs(cache_dir, exist_ok=True)
+    with stage('wdi.ingest_bulk') as s, ColumnarWriter(directory, meta={'source': source}) as out:
+        for long in read_wdi_chunks(path, series, countries, years, chunksize, exclude):
+            out.append(long)
+        s.rows = out.rows
+    print(f"Cached {out.rows:,} observations in {directory}")
+    return directory
+
+
+def load_wdi_bulk(path, series, countries=None, years=None, cache_dir=CACHE_DIR,
+                  chunksize=CHUNKSIZE, aggregates=False):
+    """Long-format observations of `series` from the bulk CSV, via the cache"""
+    directory = ingest_wdi_bulk(path, series, countries, years, cache_dir, chunksize, aggregates)
+    with stage('wdi.read_cache') as s:
+        long = read_columnar(directory)
+        s.rows = len(long)
+    return long
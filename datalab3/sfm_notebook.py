@@ -6,8 +6,14 @@ This notebook implements the Specific Factors Model and performs comparative sta
 analysis with a 20% increase in manufacturing productivity.
 """
 
-import numpy as np
-import matplotlib.pyplot as plt
+import os
+import sys
+
+# Shared helpers (figure queue) live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from figures import FigureQueue
+from pipeline import Pipeline
+from profiling import profiled
 
 # =============================================================================
 # STEP 1: DEFINE BASELINE PARAMETERS
@@ -137,270 +143,356 @@ def solve_equilibrium():
     p_star = bisect_root(excess_demand, p_low, p_high)
     return p_star
 
-# =============================================================================
-# STEP 4: SOLVE BASELINE EQUILIBRIUM (Question 1)
-# =============================================================================
-
-print("=" * 70)
-print("BASELINE EQUILIBRIUM")
-print("=" * 70)
-
-p_star_baseline = solve_equilibrium()
-print(f"\nEquilibrium relative price (P_M/P_A): {p_star_baseline:.6f}")
-
-# Compute and store baseline equilibrium values
-w_H_baseline = wage('H', p_star_baseline)
-w_F_baseline = wage('F', p_star_baseline)
-
-Y_H_M_baseline = Ym('H', p_star_baseline)
-Y_H_A_baseline = Ya('H', p_star_baseline)
-Y_F_M_baseline = Ym('F', p_star_baseline)
-Y_F_A_baseline = Ya('F', p_star_baseline)
-
-L_H_M_baseline = Lm('H', p_star_baseline)
-L_H_A_baseline = La('H', p_star_baseline)
-L_F_M_baseline = Lm('F', p_star_baseline)
-L_F_A_baseline = La('F', p_star_baseline)
-
-print(f"\nWages:")
-print(f"  w_H = {w_H_baseline:.6f}")
-print(f"  w_F = {w_F_baseline:.6f}")
-
-print(f"\nOutputs:")
-print(f"  Y_H,M = {Y_H_M_baseline:.6f}")
-print(f"  Y_H,A = {Y_H_A_baseline:.6f}")
-print(f"  Y_F,M = {Y_F_M_baseline:.6f}")
-print(f"  Y_F,A = {Y_F_A_baseline:.6f}")
-
-print(f"\nLabor Allocations:")
-print(f"  L_H,M = {L_H_M_baseline:.6f}")
-print(f"  L_H,A = {L_H_A_baseline:.6f}")
-print(f"  L_F,M = {L_F_M_baseline:.6f}")
-print(f"  L_F,A = {L_F_A_baseline:.6f}")
+@profiled('sfm.solve_scenario')
+def solve_scenario(z_m=1.0):
+    """
+    Solve the equilibrium with manufacturing productivity Z_M = z_m in both
+    countries. Returns p*, wages, outputs and labor allocations by country.
+    The module-level Z_M is restored afterwards.
+    """
+    saved = dict(Z_M)
+    Z_M['H'] = z_m
+    Z_M['F'] = z_m
+    try:
+        p = solve_equilibrium()
+        countries = ['H', 'F']
+        return {
+            'p_star': p,
+            'w': {i: wage(i, p) for i in countries},
+            'Ym': {i: Ym(i, p) for i in countries},
+            'Ya': {i: Ya(i, p) for i in countries},
+            'Lm': {i: Lm(i, p) for i in countries},
+            'La': {i: La(i, p) for i in countries},
+        }
+    finally:
+        Z_M.update(saved)
 
 # =============================================================================
-# STEP 5: INCREASE MANUFACTURING PRODUCTIVITY BY 20% (Question 2)
+# PLOTS (rendered through the shared figure queue)
+# numpy/matplotlib are imported here only, so solving the model stays light
 # =============================================================================
 
-print("\n" + "=" * 70)
-print("COMPARATIVE STATICS: 20% INCREASE IN MANUFACTURING PRODUCTIVITY")
-print("=" * 70)
-
-# Update manufacturing productivity
-Z_M['H'] = 1.2 * 1.0
-Z_M['F'] = 1.2 * 1.0
-
-# Solve new equilibrium
-p_star_new = solve_equilibrium()
-print(f"\nNew equilibrium relative price (P_M/P_A): {p_star_new:.6f}")
-
-# Compute new equilibrium values
-w_H_new = wage('H', p_star_new)
-w_F_new = wage('F', p_star_new)
+def plot_comparative_statics(data):
+    """Bar charts of world relative output and relative price, baseline vs shock"""
+    import matplotlib.pyplot as plt
+
+    rel_output_baseline, rel_output_new = data['rel_output']
+    p_star_baseline, p_star_new = data['p_star']
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+
+    # Plot 1: Relative Output
+    scenarios = ['Baseline', 'Z_M increased\nby 20%']
+    rel_outputs = [rel_output_baseline, rel_output_new]
+    ax1.bar(scenarios, rel_outputs, color=['steelblue', 'coral'], alpha=0.7, edgecolor='black')
+    ax1.set_ylabel('Relative Output (Y_M / Y_A)', fontsize=11)
+    ax1.set_title('World Relative Production', fontsize=12, fontweight='bold')
+    ax1.grid(axis='y', alpha=0.3)
+    for i, v in enumerate(rel_outputs):
+        ax1.text(i, v + 0.02, f'{v:.4f}', ha='center', fontsize=10)
+
+    # Plot 2: Relative Price
+    rel_prices = [p_star_baseline, p_star_new]
+    ax2.bar(scenarios, rel_prices, color=['steelblue', 'coral'], alpha=0.7, edgecolor='black')
+    ax2.set_ylabel('Relative Price (P_M / P_A)', fontsize=11)
+    ax2.set_title('Equilibrium Relative Price', fontsize=12, fontweight='bold')
+    ax2.grid(axis='y', alpha=0.3)
+    for i, v in enumerate(rel_prices):
+        ax2.text(i, v + 0.01, f'{v:.4f}', ha='center', fontsize=10)
 
-Y_H_M_new = Ym('H', p_star_new)
-Y_H_A_new = Ya('H', p_star_new)
-Y_F_M_new = Ym('F', p_star_new)
-Y_F_A_new = Ya('F', p_star_new)
-
-L_H_M_new = Lm('H', p_star_new)
-L_H_A_new = La('H', p_star_new)
-L_F_M_new = Lm('F', p_star_new)
-L_F_A_new = La('F', p_star_new)
-
-print(f"\nWages:")
-print(f"  w_H = {w_H_new:.6f} (change: {(w_H_new/w_H_baseline - 1)*100:.2f}%)")
-print(f"  w_F = {w_F_new:.6f} (change: {(w_F_new/w_F_baseline - 1)*100:.2f}%)")
-
-print(f"\nOutputs:")
-print(f"  Y_H,M = {Y_H_M_new:.6f} (change: {(Y_H_M_new/Y_H_M_baseline - 1)*100:.2f}%)")
-print(f"  Y_H,A = {Y_H_A_new:.6f} (change: {(Y_H_A_new/Y_H_A_baseline - 1)*100:.2f}%)")
-print(f"  Y_F,M = {Y_F_M_new:.6f} (change: {(Y_F_M_new/Y_F_M_baseline - 1)*100:.2f}%)")
-print(f"  Y_F,A = {Y_F_A_new:.6f} (change: {(Y_F_A_new/Y_F_A_baseline - 1)*100:.2f}%)")
+    plt.tight_layout()
+    return fig
+
+
+def plot_real_wages(data):
+    """Real wages in terms of each good, levels and % changes, baseline vs shock"""
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    baseline_wA, new_wA = data['baseline_wA'], data['new_wA']
+    baseline_wM, new_wM = data['baseline_wM'], data['new_wM']
+    countries = data['countries']
+
+    fig, axes = plt.subplots(2, 2, figsize=(12, 10))
+    # Set a non-interactive backend to avoid display issues
+    plt.ioff()
+
+    # Plot real wages in terms of agriculture
+    x = np.arange(len(countries))
+    width = 0.35
+    axes[0, 0].bar(x - width/2, baseline_wA, width, label='Baseline', color='steelblue', alpha=0.7)
+    axes[0, 0].bar(x + width/2, new_wA, width, label='After shock', color='coral', alpha=0.7)
+    axes[0, 0].set_ylabel('w / P_A', fontsize=11)
+    axes[0, 0].set_title('Real Wage in Terms of Agriculture', fontsize=12, fontweight='bold')
+    axes[0, 0].set_xticks(x)
+    axes[0, 0].set_xticklabels(countries)
+    axes[0, 0].legend()
+    axes[0, 0].grid(axis='y', alpha=0.3)
+
+    # Plot real wages in terms of manufacturing
+    axes[0, 1].bar(x - width/2, baseline_wM, width, label='Baseline', color='steelblue', alpha=0.7)
+    axes[0, 1].bar(x + width/2, new_wM, width, label='After shock', color='coral', alpha=0.7)
+    axes[0, 1].set_ylabel('w / P_M', fontsize=11)
+    axes[0, 1].set_title('Real Wage in Terms of Manufacturing', fontsize=12, fontweight='bold')
+    axes[0, 1].set_xticks(x)
+    axes[0, 1].set_xticklabels(countries)
+    axes[0, 1].legend()
+    axes[0, 1].grid(axis='y', alpha=0.3)
+
+    # Plot percentage changes
+    pct_change_A = [(new_wA[i]/baseline_wA[i] - 1)*100 for i in range(2)]
+    pct_change_M = [(new_wM[i]/baseline_wM[i] - 1)*100 for i in range(2)]
+
+    axes[1, 0].bar(countries, pct_change_A, color='green', alpha=0.7, edgecolor='black')
+    axes[1, 0].set_ylabel('% Change', fontsize=11)
+    axes[1, 0].set_title('% Change in Real Wage (w/P_A)', fontsize=12, fontweight='bold')
+    axes[1, 0].axhline(y=0, color='black', linestyle='-', linewidth=0.8)
+    axes[1, 0].grid(axis='y', alpha=0.3)
+    for i, v in enumerate(pct_change_A):
+        axes[1, 0].text(i, v + 0.5 if v > 0 else v - 0.5, f'{v:.2f}%', ha='center', fontsize=10)
+
+    axes[1, 1].bar(countries, pct_change_M, color='green', alpha=0.7, edgecolor='black')
+    axes[1, 1].set_ylabel('% Change', fontsize=11)
+    axes[1, 1].set_title('% Change in Real Wage (w/P_M)', fontsize=12, fontweight='bold')
+    axes[1, 1].axhline(y=0, color='black', linestyle='-', linewidth=0.8)
+    axes[1, 1].grid(axis='y', alpha=0.3)
+    for i, v in enumerate(pct_change_M):
+        axes[1, 1].text(i, v + 0.5 if v > 0 else v - 0.5, f'{v:.2f}%', ha='center', fontsize=10)
+
+    try:
+        plt.tight_layout()
+    except:
+        pass
+    return fig
 
-print(f"\nLabor Allocations:")
-print(f"  L_H,M = {L_H_M_new:.6f} (change: {(L_H_M_new/L_H_M_baseline - 1)*100:.2f}%)")
-print(f"  L_H,A = {L_H_A_new:.6f} (change: {(L_H_A_new/L_H_A_baseline - 1)*100:.2f}%)")
-print(f"  L_F,M = {L_F_M_new:.6f} (change: {(L_F_M_new/L_F_M_baseline - 1)*100:.2f}%)")
-print(f"  L_F,A = {L_F_A_new:.6f} (change: {(L_F_A_new/L_F_A_baseline - 1)*100:.2f}%)")
 
 # =============================================================================
-# QUESTION 2b: Compare labor allocations
+# STEP 4+: RUN THE LAB (Questions 1-2)
 # =============================================================================
 
-print("\n" + "=" * 70)
-print("QUESTION 2b: LABOR ALLOCATION CHANGES")
-print("=" * 70)
-
-print("\nLabor moved TO manufacturing (from agriculture):")
-print(f"  Home: {L_H_M_new - L_H_M_baseline:.6f} workers")
-print(f"  Foreign: {L_F_M_new - L_F_M_baseline:.6f} workers")
-
-print("\nInterpretation:")
-print("NOTE: In this specific case, labor allocation does NOT change because")
-print("the equilibrium price adjustment exactly offsets the productivity increase.")
-print("Mathematically: p_new * Z_M_new = p_baseline * Z_M_baseline = 0.833808")
-print("Since Omega = (p*Z_M/Z_A)^(1/beta) * (K/T), and p*Z_M stays constant,")
-print("Omega stays constant, so labor allocation stays constant.")
-print("This is a special case - in general, labor would reallocate.")
+def report(baseline, shock, queue=None):
+    """
+    Print the baseline and 20% productivity-shock results (from solve_scenario).
+    Figures are queued on `queue` if given, otherwise rendered at the end.
+    """
+    render_now = queue is None
+    if render_now:
+        queue = FigureQueue()
+
+    # =============================================================================
+    # STEP 4: SOLVE BASELINE EQUILIBRIUM (Question 1)
+    # =============================================================================
+
+    print("=" * 70)
+    print("BASELINE EQUILIBRIUM")
+    print("=" * 70)
+
+    p_star_baseline = baseline['p_star']
+    print(f"\nEquilibrium relative price (P_M/P_A): {p_star_baseline:.6f}")
+
+    # Baseline equilibrium values
+    w_H_baseline = baseline['w']['H']
+    w_F_baseline = baseline['w']['F']
+
+    Y_H_M_baseline = baseline['Ym']['H']
+    Y_H_A_baseline = baseline['Ya']['H']
+    Y_F_M_baseline = baseline['Ym']['F']
+    Y_F_A_baseline = baseline['Ya']['F']
+
+    L_H_M_baseline = baseline['Lm']['H']
+    L_H_A_baseline = baseline['La']['H']
+    L_F_M_baseline = baseline['Lm']['F']
+    L_F_A_baseline = baseline['La']['F']
+
+    print(f"\nWages:")
+    print(f"  w_H = {w_H_baseline:.6f}")
+    print(f"  w_F = {w_F_baseline:.6f}")
+
+    print(f"\nOutputs:")
+    print(f"  Y_H,M = {Y_H_M_baseline:.6f}")
+    print(f"  Y_H,A = {Y_H_A_baseline:.6f}")
+    print(f"  Y_F,M = {Y_F_M_baseline:.6f}")
+    print(f"  Y_F,A = {Y_F_A_baseline:.6f}")
+
+    print(f"\nLabor Allocations:")
+    print(f"  L_H,M = {L_H_M_baseline:.6f}")
+    print(f"  L_H,A = {L_H_A_baseline:.6f}")
+    print(f"  L_F,M = {L_F_M_baseline:.6f}")
+    print(f"  L_F,A = {L_F_A_baseline:.6f}")
+
+    # =============================================================================
+    # STEP 5: INCREASE MANUFACTURING PRODUCTIVITY BY 20% (Question 2)
+    # =============================================================================
+
+    print("\n" + "=" * 70)
+    print("COMPARATIVE STATICS: 20% INCREASE IN MANUFACTURING PRODUCTIVITY")
+    print("=" * 70)
+
+    # New equilibrium (Z_M raised by 20%)
+    p_star_new = shock['p_star']
+    print(f"\nNew equilibrium relative price (P_M/P_A): {p_star_new:.6f}")
+
+    # New equilibrium values
+    w_H_new = shock['w']['H']
+    w_F_new = shock['w']['F']
+
+    Y_H_M_new = shock['Ym']['H']
+    Y_H_A_new = shock['Ya']['H']
+    Y_F_M_new = shock['Ym']['F']
+    Y_F_A_new = shock['Ya']['F']
+
+    L_H_M_new = shock['Lm']['H']
+    L_H_A_new = shock['La']['H']
+    L_F_M_new = shock['Lm']['F']
+    L_F_A_new = shock['La']['F']
+
+    print(f"\nWages:")
+    print(f"  w_H = {w_H_new:.6f} (change: {(w_H_new/w_H_baseline - 1)*100:.2f}%)")
+    print(f"  w_F = {w_F_new:.6f} (change: {(w_F_new/w_F_baseline - 1)*100:.2f}%)")
+
+    print(f"\nOutputs:")
+    print(f"  Y_H,M = {Y_H_M_new:.6f} (change: {(Y_H_M_new/Y_H_M_baseline - 1)*100:.2f}%)")
+    print(f"  Y_H,A = {Y_H_A_new:.6f} (change: {(Y_H_A_new/Y_H_A_baseline - 1)*100:.2f}%)")
+    print(f"  Y_F,M = {Y_F_M_new:.6f} (change: {(Y_F_M_new/Y_F_M_baseline - 1)*100:.2f}%)")
+    print(f"  Y_F,A = {Y_F_A_new:.6f} (change: {(Y_F_A_new/Y_F_A_baseline - 1)*100:.2f}%)")
+
+    print(f"\nLabor Allocations:")
+    print(f"  L_H,M = {L_H_M_new:.6f} (change: {(L_H_M_new/L_H_M_baseline - 1)*100:.2f}%)")
+    print(f"  L_H,A = {L_H_A_new:.6f} (change: {(L_H_A_new/L_H_A_baseline - 1)*100:.2f}%)")
+    print(f"  L_F,M = {L_F_M_new:.6f} (change: {(L_F_M_new/L_F_M_baseline - 1)*100:.2f}%)")
+    print(f"  L_F,A = {L_F_A_new:.6f} (change: {(L_F_A_new/L_F_A_baseline - 1)*100:.2f}%)")
+
+    # =============================================================================
+    # QUESTION 2b: Compare labor allocations
+    # =============================================================================
+
+    print("\n" + "=" * 70)
+    print("QUESTION 2b: LABOR ALLOCATION CHANGES")
+    print("=" * 70)
+
+    print("\nLabor moved TO manufacturing (from agriculture):")
+    print(f"  Home: {L_H_M_new - L_H_M_baseline:.6f} workers")
+    print(f"  Foreign: {L_F_M_new - L_F_M_baseline:.6f} workers")
+
+    print("\nInterpretation:")
+    print("NOTE: In this specific case, labor allocation does NOT change because")
+    print("the equilibrium price adjustment exactly offsets the productivity increase.")
+    print("Mathematically: p_new * Z_M_new = p_baseline * Z_M_baseline = 0.833808")
+    print("Since Omega = (p*Z_M/Z_A)^(1/beta) * (K/T), and p*Z_M stays constant,")
+    print("Omega stays constant, so labor allocation stays constant.")
+    print("This is a special case - in general, labor would reallocate.")
+
+    # =============================================================================
+    # QUESTION 2c: Plot relative output and prices
+    # =============================================================================
+
+    # Calculate relative outputs
+    rel_output_baseline = (Y_H_M_baseline + Y_F_M_baseline) / (Y_H_A_baseline + Y_F_A_baseline)
+    rel_output_new = (Y_H_M_new + Y_F_M_new) / (Y_H_A_new + Y_F_A_new)
+
+    print("\n" + "=" * 70)
+    print("QUESTION 2c: RELATIVE OUTPUT AND PRICES")
+    print("=" * 70)
+
+    print(f"\nRelative world production (Y_M/Y_A):")
+    print(f"  Baseline: {rel_output_baseline:.6f}")
+    print(f"  New: {rel_output_new:.6f}")
+    print(f"  Change: {(rel_output_new/rel_output_baseline - 1)*100:.2f}%")
+
+    print(f"\nRelative price (P_M/P_A):")
+    print(f"  Baseline: {p_star_baseline:.6f}")
+    print(f"  New: {p_star_new:.6f}")
+    print(f"  Change: {(p_star_new/p_star_baseline - 1)*100:.2f}%")
+
+    # Create comparison plot
+    queue.add(plot_comparative_statics,
+              {'rel_output': [rel_output_baseline, rel_output_new],
+               'p_star': [p_star_baseline, p_star_new]},
+              'comparative_statics.png', bbox_inches='tight')
+
+    print("\nEconomic Interpretation:")
+    print("- SUPPLY EFFECT: Productivity increase shifts RS curve right -> more M produced")
+    print("- PRICE EFFECT: Increased supply of M lowers its relative price (P_M/P_A falls)")
+    print("- DEMAND EFFECT: Lower P_M increases quantity demanded of M")
+    print("- EQUILIBRIUM: Both relative output Y_M/Y_A and relative price P_M/P_A change")
+
+    # =============================================================================
+    # QUESTION 2d: Real wages and consumer welfare
+    # =============================================================================
+
+    print("\n" + "=" * 70)
+    print("QUESTION 2d: REAL WAGES AND CONSUMER WELFARE")
+    print("=" * 70)
+
+    # Real wages in terms of agriculture (P_A = 1)
+    real_wage_A_H_baseline = w_H_baseline / 1.0
+    real_wage_A_F_baseline = w_F_baseline / 1.0
+    real_wage_A_H_new = w_H_new / 1.0
+    real_wage_A_F_new = w_F_new / 1.0
+
+    # Real wages in terms of manufacturing
+    real_wage_M_H_baseline = w_H_baseline / p_star_baseline
+    real_wage_M_F_baseline = w_F_baseline / p_star_baseline
+    real_wage_M_H_new = w_H_new / p_star_new
+    real_wage_M_F_new = w_F_new / p_star_new
+
+    print("\nReal Wages (w/P_A):")
+    print(f"  Home - Baseline: {real_wage_A_H_baseline:.6f}, New: {real_wage_A_H_new:.6f}, "
+          f"Change: {(real_wage_A_H_new/real_wage_A_H_baseline - 1)*100:.2f}%")
+    print(f"  Foreign - Baseline: {real_wage_A_F_baseline:.6f}, New: {real_wage_A_F_new:.6f}, "
+          f"Change: {(real_wage_A_F_new/real_wage_A_F_baseline - 1)*100:.2f}%")
+
+    print("\nReal Wages (w/P_M):")
+    print(f"  Home - Baseline: {real_wage_M_H_baseline:.6f}, New: {real_wage_M_H_new:.6f}, "
+          f"Change: {(real_wage_M_H_new/real_wage_M_H_baseline - 1)*100:.2f}%")
+    print(f"  Foreign - Baseline: {real_wage_M_F_baseline:.6f}, New: {real_wage_M_F_new:.6f}, "
+          f"Change: {(real_wage_M_F_new/real_wage_M_F_baseline - 1)*100:.2f}%")
+
+    # Visualize real wage changes
+    countries = ['Home', 'Foreign']
+    baseline_wA = [real_wage_A_H_baseline, real_wage_A_F_baseline]
+    new_wA = [real_wage_A_H_new, real_wage_A_F_new]
+    baseline_wM = [real_wage_M_H_baseline, real_wage_M_F_baseline]
+    new_wM = [real_wage_M_H_new, real_wage_M_F_new]
+
+    queue.add(plot_real_wages,
+              {'countries': countries, 'baseline_wA': baseline_wA, 'new_wA': new_wA,
+               'baseline_wM': baseline_wM, 'new_wM': new_wM},
+              'real_wages_analysis.png')
+
+    print("\nWelfare Analysis:")
+    print("- Real wage in terms of AGRICULTURE (w/P_A): INCREASED in both countries")
+    print("- Real wage in terms of MANUFACTURING (w/P_M): INCREASED even more!")
+    print("- Consumers are BETTER OFF: They can afford more of both goods")
+    print("- Why? Productivity gains in M lower P_M, benefiting all consumers")
+    print("- Workers' purchasing power rises for both goods -> welfare improvement")
+
+    if render_now:
+        queue.render()
+
+    print("\n" + "=" * 70)
+    print("ANALYSIS COMPLETE")
+    print("=" * 70)
+
+
+def build_pipeline(cache_dir='.pipeline_cache'):
+    """
+    Stages: baseline and shock equilibria -> report. The solves are keyed on
+    the whole module source since they read the module-level parameters,
+    and run serially because solve_scenario temporarily changes Z_M.
+    """
+    module = sys.modules[__name__]
+    pipe = Pipeline(cache_dir=cache_dir, max_workers=1)
+    pipe.add('baseline', solve_scenario, params={'z_m': 1.0}, code=[module])
+    pipe.add('shock', solve_scenario, params={'z_m': 1.2}, code=[module])
+    pipe.add('report', report, deps=['baseline', 'shock'], cache=False)
+    return pipe
 
-# =============================================================================
-# QUESTION 2c: Plot relative output and prices
-# =============================================================================
 
-# Calculate relative outputs
-rel_output_baseline = (Y_H_M_baseline + Y_F_M_baseline) / (Y_H_A_baseline + Y_F_A_baseline)
-rel_output_new = (Y_H_M_new + Y_F_M_new) / (Y_H_A_new + Y_F_A_new)
-
-print("\n" + "=" * 70)
-print("QUESTION 2c: RELATIVE OUTPUT AND PRICES")
-print("=" * 70)
-
-print(f"\nRelative world production (Y_M/Y_A):")
-print(f"  Baseline: {rel_output_baseline:.6f}")
-print(f"  New: {rel_output_new:.6f}")
-print(f"  Change: {(rel_output_new/rel_output_baseline - 1)*100:.2f}%")
-
-print(f"\nRelative price (P_M/P_A):")
-print(f"  Baseline: {p_star_baseline:.6f}")
-print(f"  New: {p_star_new:.6f}")
-print(f"  Change: {(p_star_new/p_star_baseline - 1)*100:.2f}%")
-
-# Create comparison plot
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-
-# Plot 1: Relative Output
-scenarios = ['Baseline', 'Z_M increased\nby 20%']
-rel_outputs = [rel_output_baseline, rel_output_new]
-ax1.bar(scenarios, rel_outputs, color=['steelblue', 'coral'], alpha=0.7, edgecolor='black')
-ax1.set_ylabel('Relative Output (Y_M / Y_A)', fontsize=11)
-ax1.set_title('World Relative Production', fontsize=12, fontweight='bold')
-ax1.grid(axis='y', alpha=0.3)
-for i, v in enumerate(rel_outputs):
-    ax1.text(i, v + 0.02, f'{v:.4f}', ha='center', fontsize=10)
-
-# Plot 2: Relative Price
-rel_prices = [p_star_baseline, p_star_new]
-ax2.bar(scenarios, rel_prices, color=['steelblue', 'coral'], alpha=0.7, edgecolor='black')
-ax2.set_ylabel('Relative Price (P_M / P_A)', fontsize=11)
-ax2.set_title('Equilibrium Relative Price', fontsize=12, fontweight='bold')
-ax2.grid(axis='y', alpha=0.3)
-for i, v in enumerate(rel_prices):
-    ax2.text(i, v + 0.01, f'{v:.4f}', ha='center', fontsize=10)
-
-plt.tight_layout()
-plt.savefig('comparative_statics.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-print("\n[OK] Plot saved as 'comparative_statics.png'")
-
-print("\nEconomic Interpretation:")
-print("- SUPPLY EFFECT: Productivity increase shifts RS curve right -> more M produced")
-print("- PRICE EFFECT: Increased supply of M lowers its relative price (P_M/P_A falls)")
-print("- DEMAND EFFECT: Lower P_M increases quantity demanded of M")
-print("- EQUILIBRIUM: Both relative output Y_M/Y_A and relative price P_M/P_A change")
+def main():
+    """Run the lab, reusing cached equilibria when nothing changed"""
+    build_pipeline().run()
 
-# =============================================================================
-# QUESTION 2d: Real wages and consumer welfare
-# =============================================================================
 
-print("\n" + "=" * 70)
-print("QUESTION 2d: REAL WAGES AND CONSUMER WELFARE")
-print("=" * 70)
-
-# Real wages in terms of agriculture (P_A = 1)
-real_wage_A_H_baseline = w_H_baseline / 1.0
-real_wage_A_F_baseline = w_F_baseline / 1.0
-real_wage_A_H_new = w_H_new / 1.0
-real_wage_A_F_new = w_F_new / 1.0
-
-# Real wages in terms of manufacturing
-real_wage_M_H_baseline = w_H_baseline / p_star_baseline
-real_wage_M_F_baseline = w_F_baseline / p_star_baseline
-real_wage_M_H_new = w_H_new / p_star_new
-real_wage_M_F_new = w_F_new / p_star_new
-
-print("\nReal Wages (w/P_A):")
-print(f"  Home - Baseline: {real_wage_A_H_baseline:.6f}, New: {real_wage_A_H_new:.6f}, "
-      f"Change: {(real_wage_A_H_new/real_wage_A_H_baseline - 1)*100:.2f}%")
-print(f"  Foreign - Baseline: {real_wage_A_F_baseline:.6f}, New: {real_wage_A_F_new:.6f}, "
-      f"Change: {(real_wage_A_F_new/real_wage_A_F_baseline - 1)*100:.2f}%")
-
-print("\nReal Wages (w/P_M):")
-print(f"  Home - Baseline: {real_wage_M_H_baseline:.6f}, New: {real_wage_M_H_new:.6f}, "
-      f"Change: {(real_wage_M_H_new/real_wage_M_H_baseline - 1)*100:.2f}%")
-print(f"  Foreign - Baseline: {real_wage_M_F_baseline:.6f}, New: {real_wage_M_F_new:.6f}, "
-      f"Change: {(real_wage_M_F_new/real_wage_M_F_baseline - 1)*100:.2f}%")
-
-# Visualize real wage changes
-fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-# Set a non-interactive backend to avoid display issues
-plt.ioff()
-
-countries = ['Home', 'Foreign']
-baseline_wA = [real_wage_A_H_baseline, real_wage_A_F_baseline]
-new_wA = [real_wage_A_H_new, real_wage_A_F_new]
-baseline_wM = [real_wage_M_H_baseline, real_wage_M_F_baseline]
-new_wM = [real_wage_M_H_new, real_wage_M_F_new]
-
-# Plot real wages in terms of agriculture
-x = np.arange(len(countries))
-width = 0.35
-axes[0, 0].bar(x - width/2, baseline_wA, width, label='Baseline', color='steelblue', alpha=0.7)
-axes[0, 0].bar(x + width/2, new_wA, width, label='After shock', color='coral', alpha=0.7)
-axes[0, 0].set_ylabel('w / P_A', fontsize=11)
-axes[0, 0].set_title('Real Wage in Terms of Agriculture', fontsize=12, fontweight='bold')
-axes[0, 0].set_xticks(x)
-axes[0, 0].set_xticklabels(countries)
-axes[0, 0].legend()
-axes[0, 0].grid(axis='y', alpha=0.3)
-
-# Plot real wages in terms of manufacturing
-axes[0, 1].bar(x - width/2, baseline_wM, width, label='Baseline', color='steelblue', alpha=0.7)
-axes[0, 1].bar(x + width/2, new_wM, width, label='After shock', color='coral', alpha=0.7)
-axes[0, 1].set_ylabel('w / P_M', fontsize=11)
-axes[0, 1].set_title('Real Wage in Terms of Manufacturing', fontsize=12, fontweight='bold')
-axes[0, 1].set_xticks(x)
-axes[0, 1].set_xticklabels(countries)
-axes[0, 1].legend()
-axes[0, 1].grid(axis='y', alpha=0.3)
-
-# Plot percentage changes
-pct_change_A = [(new_wA[i]/baseline_wA[i] - 1)*100 for i in range(2)]
-pct_change_M = [(new_wM[i]/baseline_wM[i] - 1)*100 for i in range(2)]
-
-axes[1, 0].bar(countries, pct_change_A, color='green', alpha=0.7, edgecolor='black')
-axes[1, 0].set_ylabel('% Change', fontsize=11)
-axes[1, 0].set_title('% Change in Real Wage (w/P_A)', fontsize=12, fontweight='bold')
-axes[1, 0].axhline(y=0, color='black', linestyle='-', linewidth=0.8)
-axes[1, 0].grid(axis='y', alpha=0.3)
-for i, v in enumerate(pct_change_A):
-    axes[1, 0].text(i, v + 0.5 if v > 0 else v - 0.5, f'{v:.2f}%', ha='center', fontsize=10)
-
-axes[1, 1].bar(countries, pct_change_M, color='green', alpha=0.7, edgecolor='black')
-axes[1, 1].set_ylabel('% Change', fontsize=11)
-axes[1, 1].set_title('% Change in Real Wage (w/P_M)', fontsize=12, fontweight='bold')
-axes[1, 1].axhline(y=0, color='black', linestyle='-', linewidth=0.8)
-axes[1, 1].grid(axis='y', alpha=0.3)
-for i, v in enumerate(pct_change_M):
-    axes[1, 1].text(i, v + 0.5 if v > 0 else v - 0.5, f'{v:.2f}%', ha='center', fontsize=10)
-
-try:
-    plt.tight_layout()
-except:
-    pass
-plt.savefig('real_wages_analysis.png', dpi=300)
-plt.close()
-
-print("\n[OK] Plot saved as 'real_wages_analysis.png'")
-
-print("\nWelfare Analysis:")
-print("- Real wage in terms of AGRICULTURE (w/P_A): INCREASED in both countries")
-print("- Real wage in terms of MANUFACTURING (w/P_M): INCREASED even more!")
-print("- Consumers are BETTER OFF: They can afford more of both goods")
-print("- Why? Productivity gains in M lower P_M, benefiting all consumers")
-print("- Workers' purchasing power rises for both goods -> welfare improvement")
-
-print("\n" + "=" * 70)
-print("ANALYSIS COMPLETE")
-print("=" * 70)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
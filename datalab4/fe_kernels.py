@@ -0,0 +1,193 @@
+"""
+Kernels for absorbing fixed effects: alternating projections solved by CG.
+
+demean(x, [origin_codes, destination_codes]) removes group means for each
+set of integer group codes in turn. The result equals the residual of x on
+the full set of group dummies (plus a constant), which is what AbsorbingLS
+computes for a constant-only model.
+
+Plain alternating sweeps converge slowly on sparse designs (countries that
+trade with few partners): the error shrinks by a near-constant factor per
+sweep, so thousands of sweeps can leave errors of 1e-2. Instead the sweeps
+are used as the operator of a conjugate-gradient solve: a symmetric sweep T
+(forward over the sets of groups, then back) is a symmetric contraction, and
+the fixed-effects part z of x solves (I - T) z = (I - T) x. x is projected
+off the first set of groups beforehand; on that subspace T is still
+symmetric and its leading projection does nothing, so it is skipped and a
+two-way sweep costs the same as one plain sweep. Iteration stops
+once the CG residual norm is below `tol` times the norm of x. Columns that
+reach `max_iter` iterations are reported with a warning;
+return_iterations=True also returns the iterations each column took.
+
+Numba is optional. When it is installed the sweeps run in compiled loops
+that update x in place and reuse one buffer of group sums per sweep; without
+it a NumPy version based on np.bincount is used, which allocates two
+temporaries per sweep. backend='numba' or 'numpy' forces one.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+HAVE_NUMBA = njit is not None
+TOL = 1e-10
+MAX_ITER = 10_000
+
+
+def factorize(values):
+    """Integer codes 0..n-1 for group labels (Categoricals use their codes)"""
+    if isinstance(values, (pd.Series, pd.Categorical)) and isinstance(values.dtype, pd.CategoricalDtype):
+        codes = np.asarray(values.cat.codes if isinstance(values, pd.Series) else values.codes)
+        if (codes >= 0).all():
+            return codes.astype(np.intp)
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu' and len(values) and values.min() >= 0:
+        return values.astype(np.intp)
+    codes, _ = pd.factorize(values)
+    if (codes < 0).any():
+        raise ValueError("group labels contain missing values")
+    return codes.astype(np.intp)
+
+
+# ------------------------------------------------------------------ NumPy
+
+def _group_means_numpy(x, codes, counts):
+    return np.bincount(codes, weights=x, minlength=len(counts)) / counts
+
+
+def _sweep_numpy(x, codes, counts):
+    """One pass of group-mean removal over every set of groups, in place"""
+    for c, n in zip(codes, counts):
+        x -= _group_means_numpy(x, c, n)[c]
+
+
+# ------------------------------------------------------------------ Numba
+
+if HAVE_NUMBA:
+    @njit(cache=True)
+    def _group_means_numba(x, codes, counts, means):
+        """Group means of x into the preallocated `means` buffer"""
+        means[:] = 0.0
+        for i in range(x.shape[0]):
+            means[codes[i]] += x[i]
+        for g in range(means.shape[0]):
+            means[g] /= counts[g]
+
+    @njit(cache=True)
+    def _sweep_numba(x, codes, counts, means):
+        """One pass over every set of groups, in place; codes is (n_fe, n)"""
+        for f in range(codes.shape[0]):
+            _group_means_numba(x, codes[f], counts[f], means)
+            for i in range(x.shape[0]):
+                x[i] -= means[codes[f, i]]
+
+
+# ------------------------------------------------------ conjugate gradient
+
+def _make_sweep(codes, counts, order, backend):
+    """In-place pass over the sets of groups listed in `order`, for `backend`"""
+    if backend == 'numba':
+        n = len(codes[0]) if codes else 0
+        code_matrix = (np.vstack([codes[f] for f in order]) if order
+                       else np.empty((0, n), dtype=np.intp))
+        count_matrix = np.ones((len(order), max((len(c) for c in counts), default=0)))
+        for row, f in enumerate(order):
+            count_matrix[row, :len(counts[f])] = counts[f]
+        means = np.empty(count_matrix.shape[1])
+        return lambda column: _sweep_numba(column, code_matrix, count_matrix, means)
+    order_codes = [codes[f] for f in order]
+    order_counts = [counts[f] for f in order]
+    return lambda column: _sweep_numpy(column, order_codes, order_counts)
+
+
+def _demean_cg(x, sweep, tol, max_iter):
+    """
+    Remove the fixed effects from one column in place by CG on (I - T) z =
+    (I - T) x, T being `sweep` (symmetric, in place). Returns the number of
+    iterations and whether the residual fell below tol * |x| within max_iter.
+    """
+    def apply(v, out):
+        out[:] = v
+        sweep(out)
+        np.subtract(v, out, out=out)
+        return out
+
+    residual = apply(x, np.empty_like(x))
+    direction = residual.copy()
+    step = np.empty_like(x)
+    rr = residual @ residual
+    limit = (tol * np.linalg.norm(x)) ** 2
+    iteration = 0
+    while rr > limit and iteration < max_iter:
+        iteration += 1
+        apply(direction, step)
+        alpha = rr / (direction @ step)
+        # x - z is updated directly: z += alpha * direction
+        x -= alpha * direction
+        residual -= alpha * step
+        rr, previous = residual @ residual, rr
+        direction *= rr / previous
+        direction += residual
+    return iteration, rr <= limit
+
+
+def group_sums(x, codes, n_groups=None):
+    """Sums of x (1-D, or 2-D with one column per variable) by integer group code"""
+    codes = factorize(codes)
+    n_groups = int(codes.max()) + 1 if n_groups is None else n_groups
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        return np.bincount(codes, weights=x, minlength=n_groups)
+    return np.column_stack([np.bincount(codes, weights=x[:, j], minlength=n_groups)
+                            for j in range(x.shape[1])])
+
+
+def group_means(x, codes, n_groups=None):
+    """Means of x by integer group code (NaN for empty groups)"""
+    codes = factorize(codes)
+    n_groups = int(codes.max()) + 1 if n_groups is None else n_groups
+    counts = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    sums = group_sums(x, codes, n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / (counts if sums.ndim == 1 else counts[:, None])
+
+
+def demean(x, groups, tol=TOL, max_iter=MAX_ITER, backend='auto', return_iterations=False):
+    """
+    Residuals of x (1-D, or 2-D with one column per variable) after removing
+    the fixed effects given by `groups`, a list of group label arrays. x must
+    not contain missing values. Returns a new float64 array, and with
+    return_iterations=True also the number of CG iterations each column took.
+    """
+    if backend == 'auto':
+        backend = 'numba' if HAVE_NUMBA else 'numpy'
+    if backend == 'numba' and not HAVE_NUMBA:
+        raise ImportError("backend='numba' needs numba installed")
+
+    codes = [factorize(g) for g in groups]
+    # Empty groups (unused categories) get a count of 1: their sum, and mean, is 0
+    counts = [np.maximum(np.bincount(c), 1).astype(np.float64) for c in codes]
+    # Symmetric sweep without its leading projection (x is projected off the
+    # first set of groups once, below): 1 .. k-1, then back down to 0
+    order = list(range(1, len(codes))) + list(range(len(codes) - 2, -1, -1))
+    x = np.asarray(x, dtype=np.float64)
+    # One contiguous column per variable so sweeps stream through memory
+    out = np.array(x.reshape(len(x), -1), dtype=np.float64, order='F')
+
+    project_first = _make_sweep(codes, counts, [0][:len(codes)], backend)
+    sweep = _make_sweep(codes, counts, order, backend)
+    results = []
+    for j in range(out.shape[1]):
+        project_first(out[:, j])
+        results.append(_demean_cg(out[:, j], sweep, tol, max_iter))
+    iterations = np.array([n for n, _ in results])
+    stuck = sum(not converged for _, converged in results)
+    if stuck:
+        print(f"Warning: fixed effects not converged after {max_iter:,} iterations "
+              f"in {stuck} of {len(iterations)} columns")
+    out = out.reshape(x.shape)
+    return (out, iterations) if return_iterations else out
@@ -1,95 +1,250 @@
-from linearmodels.iv.absorbing import AbsorbingLS
+import os
+import sys
 import pandas as pd
 import numpy as np
-from linearmodels.panel import PanelOLS
-import statsmodels.formula.api as smf
 
-data = r'C:\Users\15613\Downloads\Gravity_V202102.dta'
+# statsmodels, seaborn, matplotlib and (if installed) numba are imported
+# inside the functions that use them, so each step only pays for what it needs
+
+# Shared helpers (figure queue) live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from figures import FigureQueue
+from pipeline import Pipeline, File
+from profiling import stage, profiled
+from gravity_panel import GravityPanel, model_frame, STATIC, VARYING
 
-# === Load data ===
-df = pd.read_stata(data)
-print(f"Data loaded. Shape: {df.shape}")
-print(f"Columns: {df.columns.tolist()[:10]}")
-
-# === Keep only pairs between existing countries ===
-if "country_exists_o" in df.columns and "country_exists_d" in df.columns:
-    df = df[(df["country_exists_o"] == 1) & (df["country_exists_d"] == 1)].copy()
-    print(f"After filtering existing countries. Shape: {df.shape}")
-else:
-    print("Warning: country_exists columns not found, skipping filter")
-
-# dependent variable
-df["lntrade"] = np.log(df["tradeflow_comtrade_d"])
-
-# independent variables
-# Variable definitions:
-# - comlang_off: do origin (o) and destination (d) share common language? (true/false)
-# - comrelig: do o, d share common religion? (true/false)
-# - col_dep_ever: do o, d share common colonial metropolis? (true/false)
-# - contig: do o, d share a border? (true/false)
-df["lndist"] = np.log(df["distw"])
-df["lang"]   = df["comlang_off"]      # Common official language (binary)
-df["leg"]    = df["transition_legalchange"]  # Legal system transition similarity
-df["relig"]  = df["comrelig"]         # Common religion (binary)
-df["colony"] = df["col_dep_ever"]     # Common colonial metropolis (binary)
-df["border"] = df["contig"]           # Shared border/contiguity (binary)
-
-# run simple regression
-gravity_simple = smf.ols("lntrade ~ lndist", data=df).fit()
-print("="*80)
-print("SIMPLE REGRESSION: lntrade ~ lndist")
-print("="*80)
-print(gravity_simple.summary())
-
-# run OLS regression: ln Xod,t = α + β1×ln distod + β2×languageod + β3×religionod + β4×colonialod + β5×borderod + ẽod,t
-# Drop NAs for this regression
-df_ols = df.dropna(subset=["lntrade", "lndist", "lang", "relig", "colony", "border"]).copy()
-print("\n" + "="*80)
-print("OLS REGRESSION: lntrade ~ lndist + lang + relig + colony + border")
-print("="*80)
-gravity_ols = smf.ols("lntrade ~ lndist + lang + relig + colony + border", data=df_ols).fit()
-print(gravity_ols.summary())
-
-# plot figure
-
-import seaborn as sns
-import matplotlib.pyplot as plt
-
-plt.figure(figsize=(8,6))
-sns.scatterplot(x="lndist", y="lntrade", data=df, alpha=0.25, s=10)
-sns.regplot(x="lndist", y="lntrade", data=df, scatter=False, color="red")
-plt.xlabel("log(distance)")
-plt.ylabel("ln(trade)")
-plt.title("Trade flows vs. distance")
-plt.tight_layout()
-plt.savefig(r'C:\Users\15613\Downloads\gravity.png')
-plt.close()  # Close the figure instead of showing it
-
-# absorb fixed effects from all variables
-# === Construct the variables ===
-
-# drop NAs
-fe = ["iso3_o", "iso3_d"]
-depvar = ["lntrade"]
-indvar = ["lndist", "lang", "leg", "relig", "colony", "border"]
-df = df.dropna(subset=fe + depvar + indvar).copy()
-df['constant'] = 1
-
-# convert FEs to categorical
-for fe in ["iso3_o", "iso3_d"]:
-    df[fe] = df[fe].astype("category")
-
-# regressand and regressors 
-X = df['constant'].astype(float).values
-
-# run absorbing regressions (fixed effects only) for dependent variables
-for var in depvar + indvar:
-    y = df[var].astype(float).values
-    model = AbsorbingLS(y, X, absorb=df[["iso3_o", "iso3_d"]])
-    res = model.fit()
-    df[var + "_r"] = res.resids
-    print(f'Absorbed fixed effects for variable {var}')
-
-# run gravity regression 
-gravity = smf.ols("lntrade_r ~ lndist_r + lang_r + leg_r + relig_r + colony_r + border_r", data=df).fit()
-print(gravity.summary())
\ No newline at end of file
+data = r'C:\Users\15613\Downloads\Gravity_V202102.dta'
+plot_path = r'C:\Users\15613\Downloads\gravity.png'
+
+
+def load_gravity(path, years=None, columns=None):
+    """
+    Load the CEPII gravity panel and keep only pairs between existing countries.
+    With `years`, the file is read in chunks and only those years are kept;
+    `columns` limits the variables read.
+    """
+    # === Load data ===
+    with stage('gravity.read_stata') as s:
+        if years is None:
+            df = pd.read_stata(path, columns=columns)
+        else:
+            years = set(years)
+            with pd.read_stata(path, columns=columns, chunksize=500_000) as reader:
+                df = pd.concat([chunk[chunk["year"].isin(years)] for chunk in reader],
+                               ignore_index=True)
+        s.rows = len(df)
+    print(f"Data loaded. Shape: {df.shape}")
+    print(f"Columns: {df.columns.tolist()[:10]}")
+
+    # === Keep only pairs between existing countries ===
+    if "country_exists_o" in df.columns and "country_exists_d" in df.columns:
+        with stage('gravity.filter_existing') as s:
+            df = df[(df["country_exists_o"] == 1) & (df["country_exists_d"] == 1)].copy()
+            s.rows = len(df)
+        print(f"After filtering existing countries. Shape: {df.shape}")
+    else:
+        print("Warning: country_exists columns not found, skipping filter")
+    return df
+
+
+@profiled('gravity.build_variables')
+def build_variables(df):
+    """Add the log trade/distance and dummy regressors used by the gravity models"""
+    # dependent variable
+    df["lntrade"] = np.log(df["tradeflow_comtrade_d"])
+
+    # independent variables
+    # Variable definitions:
+    # - comlang_off: do origin (o) and destination (d) share common language? (true/false)
+    # - comrelig: do o, d share common religion? (true/false)
+    # - col_dep_ever: do o, d share common colonial metropolis? (true/false)
+    # - contig: do o, d share a border? (true/false)
+    df["lndist"] = np.log(df["distw"])
+    df["lang"]   = df["comlang_off"]      # Common official language (binary)
+    df["leg"]    = df["transition_legalchange"]  # Legal system transition similarity
+    df["relig"]  = df["comrelig"]         # Common religion (binary)
+    df["colony"] = df["col_dep_ever"]     # Common colonial metropolis (binary)
+    df["border"] = df["contig"]           # Shared border/contiguity (binary)
+    return df
+
+
+def build_panel(df):
+    """
+    Normalized version of build_variables: static covariates are stored once
+    per dyad and gathered per row only when a model needs them (see
+    gravity_panel.py). lang/relig/colony/border are aliases, not copies.
+    """
+    with stage('gravity.build_panel') as s:
+        panel = GravityPanel.from_frame(df)
+        panel.facts["lntrade"] = np.log(panel.facts["tradeflow_comtrade_d"])
+        # distw is stored per year if it turned out not to be constant
+        table = panel.dyads if "distw" in panel.dyads else panel.facts
+        table["lndist"] = np.log(table["distw"])
+        s.rows = len(panel)
+    print(f"Normalized panel: {len(panel.dyads)} dyads, {len(panel)} rows, "
+          f"{panel.nbytes / 2**20:.1f} MB")
+    return panel
+
+
+def run_ols(df):
+    """Simple distance regression and the pooled OLS gravity model; returns their summaries"""
+    import statsmodels.formula.api as smf
+
+    # run simple regression
+    with stage('gravity.ols_simple', rows=len(df)):
+        gravity_simple = smf.ols("lntrade ~ lndist", data=model_frame(df, ["lntrade", "lndist"])).fit()
+
+    # run OLS regression: ln Xod,t = α + β1×ln distod + β2×languageod + β3×religionod + β4×colonialod + β5×borderod + ẽod,t
+    # Drop NAs for this regression
+    df_ols = model_frame(df, ["lntrade", "lndist", "lang", "relig", "colony", "border"], dropna=True)
+    with stage('gravity.ols', rows=len(df_ols)):
+        gravity_ols = smf.ols("lntrade ~ lndist + lang + relig + colony + border", data=df_ols).fit()
+
+    # Summaries are kept as text so they can be cached between runs
+    return {"simple": gravity_simple.summary().as_text(),
+            "ols": gravity_ols.summary().as_text()}
+
+
+def plot_gravity(df):
+    """Scatter of ln(trade) against log(distance) with a fitted line"""
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(8,6))
+    sns.scatterplot(x="lndist", y="lntrade", data=df, alpha=0.25, s=10)
+    sns.regplot(x="lndist", y="lntrade", data=df, scatter=False, color="red")
+    plt.xlabel("log(distance)")
+    plt.ylabel("ln(trade)")
+    plt.title("Trade flows vs. distance")
+    plt.tight_layout()
+    return fig
+
+
+def render_plot(df, dpi=100, fmt='png'):
+    """Render the distance scatter (dpi left at matplotlib's default, as before)"""
+    queue = FigureQueue(dpi=dpi, fmt=fmt)
+    queue.add(plot_gravity, model_frame(df, ["lndist", "lntrade"]), plot_path)
+    return queue.render()
+
+
+def run_fe(df):
+    """Absorb origin and destination fixed effects, regress the residuals; returns the summary"""
+    import statsmodels.formula.api as smf
+    from fe_kernels import demean
+
+    # absorb fixed effects from all variables
+    # === Construct the variables ===
+
+    # drop NAs
+    fe = ["iso3_o", "iso3_d"]
+    depvar = ["lntrade"]
+    indvar = ["lndist", "lang", "leg", "relig", "colony", "border"]
+    with stage('gravity.fe_dropna') as s:
+        df = model_frame(df, fe + depvar + indvar, dropna=True).copy()
+        s.rows = len(df)
+
+    # convert FEs to categorical; their integer codes are the groups
+    for fe in ["iso3_o", "iso3_d"]:
+        df[fe] = df[fe].astype("category").cat.remove_unused_categories()
+    groups = [df[fe].cat.codes.to_numpy() for fe in ["iso3_o", "iso3_d"]]
+
+    # absorb the fixed effects (with a constant) from each variable by
+    # demeaning over origin and destination, solved by CG (see fe_kernels.py);
+    # same residuals as AbsorbingLS on a constant
+    for var in depvar + indvar:
+        with stage('gravity.fe_absorb', rows=len(df)) as s:
+            df[var + "_r"], iterations = demean(df[var].astype(float).values, groups,
+                                                return_iterations=True)
+            s.iterations = int(iterations[0])
+        print(f'Absorbed fixed effects for variable {var} (CG iterations: {iterations[0]})')
+
+    # run gravity regression
+    with stage('gravity.fe_ols', rows=len(df)):
+        gravity = smf.ols("lntrade_r ~ lndist_r + lang_r + leg_r + relig_r + colony_r + border_r", data=df).fit()
+    return gravity.summary().as_text()
+
+
+def update_estimates(path, state_path='gravity_state.pkl', revise=()):
+    """
+    Fold a release into the stored estimator state and return it (see
+    gravity_incremental.py). CEPII releases are cumulative, so only years
+    not yet processed, plus the years named in `revise`, are read from the
+    file; the other years are skipped while reading. Years without usable
+    trade flows count as processed.
+    """
+    from gravity_incremental import IncrementalGravity
+
+    state = (IncrementalGravity.load(state_path) if os.path.exists(state_path)
+             else IncrementalGravity())
+    revise = {int(y) for y in revise}
+
+    with stage('gravity.incremental_update') as s:
+        in_file = {int(y) for y in pd.read_stata(path, columns=["year"])["year"].unique()}
+        missing = sorted(revise - in_file)
+        if missing:
+            raise ValueError(f"years {missing} to revise are not in {path}")
+        years = sorted((in_file - set(state.processed_years)) | revise)
+        if not years:
+            print("No new years to add")
+            s.rows = 0
+            return state
+        print(f"Updating years: {', '.join(map(str, years))}")
+
+        # Only the variables the panel needs (the existence flags if present)
+        with pd.read_stata(path, iterator=True) as reader:
+            available = set(reader.read(1).columns)
+        wanted = (["year", "iso3_o", "iso3_d", "country_exists_o", "country_exists_d"]
+                  + STATIC + VARYING)
+        columns = [c for c in wanted if c in available]
+        panel = build_panel(load_gravity(path, years=years, columns=columns))
+        state.update(panel, replace=bool(revise), years=years)
+        s.rows = len(panel)
+    state.save(state_path)
+    return state
+
+
+def report(ols=None, fe=None):
+    """Print the regression tables (either set may be omitted)"""
+    if ols is not None:
+        print("="*80)
+        print("SIMPLE REGRESSION: lntrade ~ lndist")
+        print("="*80)
+        print(ols["simple"])
+
+        print("\n" + "="*80)
+        print("OLS REGRESSION: lntrade ~ lndist + lang + relig + colony + border")
+        print("="*80)
+        print(ols["ols"])
+
+    if fe is not None:
+        print(fe)
+
+
+def build_pipeline(path=data, cache_dir='.pipeline_cache'):
+    """
+    Stages of the gravity lab: load -> variables -> (ols, plot, fe) -> report.
+    Only stages whose code or inputs changed are rerun; ols, plot and fe
+    run in parallel. Stages are also keyed on the helper modules they call,
+    and the plot stage always runs (the figure queue skips unchanged figures
+    itself, and recreates a deleted one).
+    """
+    import gravity_panel
+    import fe_kernels
+
+    pipe = Pipeline(cache_dir=cache_dir)
+    pipe.add('load', load_gravity, params={'path': File(path)})
+    pipe.add('variables', build_panel, deps=['load'], code=[gravity_panel])
+    pipe.add('ols', run_ols, deps=['variables'], code=[gravity_panel])
+    pipe.add('plot', render_plot, deps=['variables'], cache=False)
+    pipe.add('fe', run_fe, deps=['variables'], code=[gravity_panel, fe_kernels])
+    pipe.add('report', report, deps=['ols', 'fe'], cache=False)
+    return pipe
+
+
+def main():
+    """Run the Data Lab 4 gravity analysis, reusing cached stages where possible"""
+    build_pipeline().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Memory-mapped column store for sharing the gravity regressors between processes.
+
+export_arrays() writes the numeric columns used by gravity.py to one binary
+file: an 8-byte magic, the header length, a JSON schema (row count, country
+list, column name/dtype/offset) and then each column as a contiguous block
+aligned to 64 bytes. iso3_o/iso3_d are stored as integer codes into the
+country list, year as int16.
+
+attach() maps the file read-only and exposes each column as a NumPy view of
+the mapping, so nothing is copied and N worker processes share one physical
+copy through the OS page cache. A SharedArrays object pickles as its path, so
+passing it to a ProcessPoolExecutor sends a few bytes and each worker
+re-attaches:
+
+    export_arrays(panel, 'gravity_arrays.bin')
+    store = attach('gravity_arrays.bin')
+    store['lntrade'], store.labels('iso3_o')
+    ols_by_year(store, max_workers=4)
+
+On Windows a mapped file cannot be replaced, so re-export only after workers
+have finished.
+"""
+
+import json
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from gravity_panel import GravityPanel
+
+MAGIC = b'GRAVARR1'
+ALIGN = 64
+
+# Columns exported by default (as named in gravity.py)
+COLUMNS = ["lntrade", "lndist", "lang", "leg", "relig", "colony", "border"]
+CODED = ["iso3_o", "iso3_d"]
+REGRESSORS = ["lndist", "lang", "relig", "colony", "border"]
+
+
+def _values(data, name, rows=None):
+    """Row-level values of `name` from a GravityPanel or a wide DataFrame"""
+    if isinstance(data, GravityPanel):
+        return data.column(name, rows)
+    values = data[name].to_numpy()
+    return values if rows is None else values[rows]
+
+
+def _numeric(values):
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values.astype(np.int8)
+    if values.dtype == object:
+        return values.astype(np.float64)
+    return values
+
+
+def export_arrays(data, path, columns=COLUMNS):
+    """
+    Write `columns` plus the coded iso3_o/iso3_d and year of `data` (a
+    GravityPanel or a frame from build_variables) to `path`. Columns are
+    gathered and written one at a time, so peak memory is one column.
+    """
+    n_rows = len(data)
+    countries = pd.Index(np.union1d(pd.unique(np.asarray(_values(data, "iso3_o"))),
+                                    pd.unique(np.asarray(_values(data, "iso3_d")))))
+    code_dtype = np.int16 if len(countries) < 2**15 else np.int32
+
+    def produce(name):
+        if name in CODED:
+            return pd.Categorical(_values(data, name), categories=countries).codes.astype(code_dtype)
+        if name == "year":
+            return np.asarray(_values(data, name)).astype(np.int16)
+        return _numeric(_values(data, name))
+
+    # The schema needs every dtype up front; an empty gather gives it cheaply
+    names = CODED + ["year"] + list(columns)
+    dtypes = {name: np.dtype(code_dtype) for name in CODED}
+    dtypes["year"] = np.dtype(np.int16)
+    for name in columns:
+        dtypes[name] = _numeric(_values(data, name, np.arange(0))).dtype
+
+    # Offsets depend on the header length, which depends on the offsets;
+    # grow the space reserved for the header until it fits
+    data_start = 0
+    while True:
+        schema = {"version": 1, "rows": n_rows, "countries": countries.tolist(),
+                  "coded": CODED, "columns": []}
+        offset = data_start
+        for name in names:
+            schema["columns"].append({"name": name, "dtype": dtypes[name].str, "offset": offset})
+            offset += -(-(n_rows * dtypes[name].itemsize) // ALIGN) * ALIGN
+        header = json.dumps(schema).encode()
+        if 16 + len(header) <= data_start:
+            break
+        data_start = -(-(16 + len(header) + ALIGN) // ALIGN) * ALIGN
+
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for col in schema["columns"]:
+            values = np.ascontiguousarray(produce(col["name"]), dtype=col["dtype"])
+            f.write(b'\0' * (col["offset"] - f.tell()))
+            f.write(memoryview(values).cast('B'))
+        f.write(b'\0' * (offset - f.tell()))
+    os.replace(tmp, path)
+    return path
+
+
+class SharedArrays:
+    """Read-only, zero-copy view of a file written by export_arrays()"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != MAGIC:
+            raise ValueError(f"{path} is not a gravity array store")
+        size = int.from_bytes(self._map[8:16], 'little')
+        self.schema = json.loads(self._map[16:16 + size])
+        self.rows = self.schema["rows"]
+        self.countries = np.array(self.schema["countries"], dtype=object)
+        self.arrays = {col["name"]: np.frombuffer(self._map, dtype=col["dtype"], count=self.rows,
+                                                  offset=col["offset"])
+                       for col in self.schema["columns"]}
+
+    def __reduce__(self):
+        # Workers re-map the file instead of receiving a copy of the data
+        return attach, (self.path,)
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def keys(self):
+        return list(self.arrays)
+
+    def labels(self, name):
+        """Country codes of a coded column as strings (this one does copy)"""
+        return self.countries[self.arrays[name]]
+
+    def frame(self, columns=None):
+        """DataFrame over the mapped columns (coded columns stay integer)"""
+        columns = self.keys() if columns is None else columns
+        return pd.DataFrame({name: self.arrays[name] for name in columns}, copy=False)
+
+
+def attach(path):
+    """Map an exported store; cheap enough to call once per worker"""
+    return SharedArrays(path)
+
+
+def _ols_year(store, year, regressors):
+    """OLS of lntrade on `regressors` for one year, read straight from the mapping"""
+    rows = np.flatnonzero(store["year"] == year)
+    y = store["lntrade"][rows]
+    X = np.column_stack([np.ones(len(rows))] + [store[name][rows] for name in regressors])
+    keep = np.isfinite(y) & np.isfinite(X).all(axis=1)
+    y, X = y[keep], X[keep]
+    beta, *_ = np.linalg.lstsq(X, y, rcond=None)
+    return year, int(keep.sum()), beta
+
+
+def ols_by_year(store, regressors=REGRESSORS, max_workers=None):
+    """
+    Year-by-year pooled OLS coefficients, one year per task in a process pool.
+    Returns a DataFrame indexed by year with n and one column per coefficient.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not isinstance(store, SharedArrays):
+        store = attach(store)
+    years = np.unique(store["year"]).tolist()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_ols_year, [store] * len(years), years,
+                                [list(regressors)] * len(years)))
+    table = pd.DataFrame([[n] + beta.tolist() for _, n, beta in results],
+                         index=pd.Index([year for year, _, _ in results], name="year"),
+                         columns=["n", "const"] + list(regressors))
+    return table
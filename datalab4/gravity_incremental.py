@@ -0,0 +1,235 @@
+"""
+Updatable estimates of lntrade ~ lndist + lang + relig + colony + border.
+
+Each CEPII/Comtrade release adds a year to the panel. Instead of refitting
+everything, IncrementalGravity keeps sufficient statistics per year:
+
+    ZtZ   cross-products of Z = [1, regressors, lntrade]
+    So    sums of Z by origin country     (= D_o'Z)
+    Sd    sums of Z by destination country (= D_d'Z)
+    Cod   origin x destination row counts  (= D_o'D_d)
+
+The pooled OLS fit only needs the summed ZtZ. The two-way (origin and
+destination) fixed-effects fit is the same regression with the country
+dummies included; their blocks of the normal equations are exactly So, Sd
+and Cod, so the within estimate is recovered by partialling them out of ZtZ.
+Adding or revising a year costs time proportional to that year's rows; the
+final solve depends only on the number of countries. Years that were read but
+have no usable rows (no Comtrade flows) are remembered too, so they are not
+read again; see processed_years.
+
+    state = IncrementalGravity()
+    state.update(panel)                          # any number of years
+    state.update(new_release, replace=True)      # append 2021, revise 2020
+    state.save('gravity_state.pkl')
+    print(state.summary())
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from gravity_panel import model_frame
+
+REGRESSORS = ["lndist", "lang", "relig", "colony", "border"]
+DEPVAR = "lntrade"
+
+
+class _YearMoments:
+    """Sufficient statistics of one year"""
+
+    def __init__(self, n, ztz, so, sd, cod):
+        self.n = n
+        self.ztz = ztz
+        self.so = so
+        self.sd = sd
+        self.cod = cod
+
+    def pad(self, n_countries):
+        """Make room for countries added since this year was stored"""
+        grow = n_countries - len(self.so)
+        if grow > 0:
+            self.so = np.vstack([self.so, np.zeros((grow, self.so.shape[1]))])
+            self.sd = np.vstack([self.sd, np.zeros((grow, self.sd.shape[1]))])
+            self.cod = np.pad(self.cod, ((0, grow), (0, grow)))
+
+
+class IncrementalGravity:
+    """Pooled OLS and two-way FE gravity estimates that update year by year"""
+
+    def __init__(self, regressors=REGRESSORS):
+        self.regressors = list(regressors)
+        self.countries = []
+        self._country_index = {}
+        self._years = {}
+        self._empty = set()
+
+    def __setstate__(self, state):
+        # States saved before years without usable rows were tracked
+        state.setdefault("_empty", set())
+        self.__dict__.update(state)
+
+    @property
+    def years(self):
+        """Years that contribute to the estimates"""
+        return sorted(self._years)
+
+    @property
+    def processed_years(self):
+        """Years already read, including those that had no usable rows"""
+        return sorted(set(self._years) | self._empty)
+
+    @property
+    def nobs(self):
+        return sum(m.n for m in self._years.values())
+
+    # ---------------------------------------------------------------- updates
+
+    def update(self, data, replace=False, years=None):
+        """
+        Add the years in `data` (a GravityPanel or a frame from
+        build_variables), or the given `years` if data was read for those. A
+        year that is already processed raises ValueError unless
+        replace=True, in which case its statistics are recomputed from
+        `data` (a revised release). A year without usable rows is recorded
+        as processed, and a revised one is dropped from the estimates.
+        """
+        if years is None:
+            years = pd.unique(model_frame(data, ["year"])["year"])
+        years = {int(y) for y in years}
+        stored = sorted(years & set(self.processed_years))
+        if stored and not replace:
+            raise ValueError(f"years {stored} are already processed; pass replace=True to revise them")
+
+        frame = model_frame(data, ["iso3_o", "iso3_d", "year", DEPVAR] + self.regressors,
+                            dropna=True)
+        frame = frame[frame["year"].isin(years)]
+        row_years = frame["year"].to_numpy()
+        present = pd.unique(row_years)
+        for year in years - {int(y) for y in present}:
+            self._years.pop(year, None)
+            self._empty.add(year)
+
+        origin = self._codes(frame["iso3_o"])
+        dest = self._codes(frame["iso3_d"])
+        z = np.column_stack([np.ones(len(frame))]
+                            + [frame[name].to_numpy(dtype=float) for name in self.regressors]
+                            + [frame[DEPVAR].to_numpy(dtype=float)])
+        for year in present:
+            rows = np.flatnonzero(row_years == year)
+            self._years[int(year)] = self._moments(z[rows], origin[rows], dest[rows])
+            self._empty.discard(int(year))
+        return self
+
+    def remove_year(self, year):
+        """Drop a year from the estimates (it will be read again on the next update)"""
+        year = int(year)
+        if year not in self._empty:
+            del self._years[year]
+        self._empty.discard(year)
+
+    def _codes(self, values):
+        """Integer country codes, registering countries not seen before"""
+        values = np.asarray(values, dtype=object)
+        new = [c for c in pd.unique(values) if c not in self._country_index]
+        for country in new:
+            self._country_index[country] = len(self.countries)
+            self.countries.append(country)
+        if new:
+            for moments in self._years.values():
+                moments.pad(len(self.countries))
+        return pd.Index(self.countries).get_indexer(values)
+
+    def _moments(self, z, origin, dest):
+        g = len(self.countries)
+        so = np.column_stack([np.bincount(origin, weights=z[:, j], minlength=g)
+                              for j in range(z.shape[1])])
+        sd = np.column_stack([np.bincount(dest, weights=z[:, j], minlength=g)
+                              for j in range(z.shape[1])])
+        cod = np.bincount(origin * g + dest, minlength=g * g).reshape(g, g).astype(np.int32)
+        return _YearMoments(len(z), z.T @ z, so, sd, cod)
+
+    def _totals(self):
+        if not self._years:
+            raise ValueError("no data: call update() first")
+        moments = list(self._years.values())
+        return (sum(m.n for m in moments), sum(m.ztz for m in moments),
+                sum(m.so for m in moments), sum(m.sd for m in moments),
+                sum(m.cod.astype(np.float64) for m in moments))
+
+    # -------------------------------------------------------------- estimates
+
+    def ols(self):
+        """Pooled OLS with a constant; same estimates and SEs as smf.ols"""
+        n, ztz, *_ = self._totals()
+        k = len(self.regressors) + 1
+        xtx, xty, yty = ztz[:k, :k], ztz[:k, k], ztz[k, k]
+        beta = np.linalg.solve(xtx, xty)
+        ssr = yty - beta @ xty
+        tss = yty - ztz[0, k] ** 2 / n
+        return self._table(["Intercept"] + self.regressors, beta, np.linalg.inv(xtx), ssr, n - k,
+                           n=n, r2=1 - ssr / tss)
+
+    def fe(self):
+        """
+        Regressors with origin and destination fixed effects; same estimates
+        and SEs as smf.ols with C(iso3_o) + C(iso3_d) dummies.
+        """
+        n, ztz, so, sd, cod = self._totals()
+        k = len(self.regressors)
+        # Normal equations of the dummies, restricted to countries with data
+        a = np.block([[np.diag(so[:, 0]), cod], [cod.T, np.diag(sd[:, 0])]])
+        b = np.vstack([so[:, 1:], sd[:, 1:]])
+        present = a.diagonal() > 0
+        a, b = a[np.ix_(present, present)], b[present]
+
+        # Project the dummies out: Z'M_D Z = Z'Z - Z'D (D'D)^+ D'Z
+        w, v = np.linalg.eigh(a)
+        keep = w > w.max() * len(w) * np.finfo(float).eps
+        vb = v[:, keep].T @ b
+        m = ztz[1:, 1:] - vb.T @ (vb / w[keep, None])
+
+        mxx, mxy, myy = m[:k, :k], m[:k, k], m[k, k]
+        beta = np.linalg.solve(mxx, mxy)
+        ssr = myy - beta @ mxy
+        return self._table(self.regressors, beta, np.linalg.inv(mxx), ssr, n - k - int(keep.sum()),
+                           n=n, r2_within=1 - ssr / myy)
+
+    @staticmethod
+    def _table(names, beta, xtx_inv, ssr, dof, **stats):
+        from scipy import stats as st
+
+        se = np.sqrt(np.diag(xtx_inv) * ssr / dof)
+        t = beta / se
+        table = pd.DataFrame({"coef": beta, "std err": se, "t": t,
+                              "P>|t|": 2 * st.t.sf(np.abs(t), dof)}, index=names)
+        table.attrs.update(stats, dof=dof)
+        return table
+
+    def summary(self):
+        """Both models as text"""
+        years = self.years
+        lines = [f"Years {years[0]}-{years[-1]} ({len(years)}), {len(self.countries)} countries"]
+        for title, table in [("POOLED OLS", self.ols()), ("ORIGIN + DESTINATION FIXED EFFECTS", self.fe())]:
+            stats = ", ".join(f"{key} = {value:,.4g}" if isinstance(value, float) else f"{key} = {value:,}"
+                              for key, value in table.attrs.items())
+            lines += ["=" * 80, f"{title}: {DEPVAR} ~ {' + '.join(self.regressors)}", "=" * 80,
+                      table.to_string(float_format=lambda x: f"{x:.4f}"), stats, ""]
+        return "\n".join(lines)
+
+    # ------------------------------------------------------------ persistence
+
+    def save(self, path):
+        """Persist the state atomically"""
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,141 @@
+"""
+Normalized in-memory storage for the CEPII gravity panel.
+
+Distance, contiguity, common language/religion and colonial ties are constant
+within an (iso3_o, iso3_d) pair, but the wide panel repeats them for every
+year. GravityPanel keeps them once per dyad and stores only the year-varying
+columns per row, linked by an integer dyad key:
+
+    dyads   one row per ordered pair:  iso3_o, iso3_d, distw, contig, comlang_off, ...
+    facts   one row per pair and year: dyad, year, tradeflow_comtrade_d, ...
+
+Row-level columns are gathered with np.take only when a model asks for them:
+
+    panel = GravityPanel.from_frame(df)
+    X = panel.frame(["lntrade", "lndist", "lang", "border"], dropna=True)
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns that are constant within a dyad, and those that change by year
+STATIC = ["distw", "contig", "comlang_off", "comrelig", "col_dep_ever"]
+VARYING = ["tradeflow_comtrade_d", "transition_legalchange"]
+
+# Regressor names used in gravity.py -> stored column
+ALIASES = {
+    "lang": "comlang_off",
+    "leg": "transition_legalchange",
+    "relig": "comrelig",
+    "colony": "col_dep_ever",
+    "border": "contig",
+}
+
+
+class GravityPanel:
+    """Dyad table of static covariates plus a slim fact table keyed by dyad id"""
+
+    def __init__(self, dyads, facts):
+        self.dyads = dyads
+        self.facts = facts
+
+    @classmethod
+    def from_frame(cls, df, static=STATIC, varying=VARYING, validate=True):
+        """
+        Split a wide dyad/year frame. Row order and index are kept in the fact
+        table, so gathered frames line up with the original rows.
+
+        Each `static` column is checked against the per-dyad value (one
+        np.take and compare). A column that is not constant within every
+        dyad, including one that is missing in some years only, is kept in
+        the fact table instead, so no row is given another year's value.
+        validate=False skips the check for data known to be clean.
+        """
+        countries = pd.Index(np.union1d(df["iso3_o"].unique(), df["iso3_d"].unique()))
+        origin = countries.get_indexer(df["iso3_o"]).astype(np.int64)
+        dest = countries.get_indexer(df["iso3_d"]).astype(np.int64)
+
+        # Dyad ids are dense and ordered by (origin, destination)
+        key, pairs = pd.factorize(origin * len(countries) + dest, sort=True)
+        key = key.astype(np.int32)
+        first = np.flatnonzero(~pd.Series(key).duplicated().to_numpy())
+        first = first[np.argsort(key[first])]
+
+        dyads = pd.DataFrame({
+            "iso3_o": pd.Categorical.from_codes(pairs // len(countries), countries),
+            "iso3_d": pd.Categorical.from_codes(pairs % len(countries), countries),
+        })
+        varying = list(varying)
+        for col in static:
+            values = df[col].to_numpy()
+            per_dyad = values[first]
+            if validate:
+                gathered = np.take(per_dyad, key)
+                same = (gathered == values) | (pd.isna(gathered) & pd.isna(values))
+                if not same.all():
+                    n_dyads = len(np.unique(key[~same]))
+                    print(f"Warning: {col} varies within {n_dyads} dyads; storing it per year")
+                    varying.append(col)
+                    continue
+            dyads[col] = per_dyad
+
+        facts = pd.DataFrame({"dyad": key, "year": df["year"].to_numpy()}, index=df.index)
+        for col in varying:
+            facts[col] = df[col].to_numpy()
+        return cls(dyads, facts)
+
+    def __len__(self):
+        return len(self.facts)
+
+    def __contains__(self, name):
+        name = ALIASES.get(name, name)
+        return name in self.facts or name in self.dyads
+
+    @property
+    def nbytes(self):
+        """Memory held by both tables"""
+        return int(self.dyads.memory_usage(deep=True).sum() + self.facts.memory_usage(deep=True).sum())
+
+    def column(self, name, rows=None):
+        """Row-level values of `name` (optionally only at positions `rows`)"""
+        name = ALIASES.get(name, name)
+        if name in self.facts:
+            values = self.facts[name].to_numpy()
+            return values if rows is None else values[rows]
+
+        key = self.facts["dyad"].to_numpy()
+        if rows is not None:
+            key = key[rows]
+        values = self.dyads[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return pd.Categorical.from_codes(np.take(values.cat.codes.to_numpy(), key),
+                                             values.cat.categories)
+        return np.take(values.to_numpy(), key)
+
+    def frame(self, columns, dropna=False):
+        """
+        DataFrame of `columns` at row level. With dropna=True, rows missing any
+        of them are dropped before the dyad columns are gathered.
+        """
+        rows = None
+        index = self.facts.index
+        if dropna:
+            key = self.facts["dyad"].to_numpy()
+            keep = np.ones(len(key), dtype=bool)
+            for col in columns:
+                name = ALIASES.get(col, col)
+                if name in self.facts:
+                    keep &= self.facts[name].notna().to_numpy()
+                else:
+                    keep &= np.take(self.dyads[name].notna().to_numpy(), key)
+            rows = np.flatnonzero(keep)
+            index = index[rows]
+        return pd.DataFrame({col: self.column(col, rows) for col in columns}, index=index)
+
+
+def model_frame(data, columns, dropna=False):
+    """The columns one model needs, from a GravityPanel or a wide DataFrame"""
+    if isinstance(data, GravityPanel):
+        return data.frame(columns, dropna=dropna)
+    frame = data[columns]
+    return frame.dropna() if dropna else frame
@@ -0,0 +1,248 @@
+"""
+Figure job queue shared by the data lab pipelines.
+
+Plots are collected as data (a renderer function plus the data it draws) and
+rendered together in a process pool on the Agg backend. Each job is keyed by a
+hash of its data, renderer code and output settings; a figure whose hash is
+unchanged since the last render is skipped.
+
+Usage:
+    queue = FigureQueue(dpi=300, fmt='png')
+    queue.add(plot_trade_comparison, df_long, 'trade_comparison_usa_china.png')
+    queue.render()
+
+A renderer is a module-level function that takes the job's data, draws a new
+figure with matplotlib and returns it. It must be importable by name so
+worker processes can unpickle it. If any figure fails, the others are still
+rendered and render() then raises FigureRenderError naming the failed files.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+from profiling import stage
+
+MANIFEST = '.figure_hashes.json'
+
+
+class FigureRenderError(RuntimeError):
+    """
+    Raised by FigureQueue.render() after the other figures were rendered;
+    .errors maps each failed output to its exception, .status is the full
+    status dict render() would have returned.
+    """
+
+    def __init__(self, errors, status):
+        self.errors = errors
+        self.status = status
+        failed = ', '.join(f"'{output}' ({type(e).__name__}: {e})" for output, e in errors.items())
+        super().__init__(f"{len(errors)} figure(s) failed to render: {failed}")
+
+
+def data_hash(obj):
+    """Stable content hash of plot/stage data (DataFrames, arrays, dicts, scalars)"""
+    h = hashlib.sha256()
+    _update_hash(h, obj)
+    return h.hexdigest()
+
+
+def _update_hash(h, obj):
+    """Feed `obj` into hash `h`, recursing through containers"""
+    # Imported lazily so hashing plain data does not pull in pandas
+    if type(obj).__module__.startswith('pandas'):
+        import pandas as pd
+        if isinstance(obj, pd.DataFrame):
+            h.update(b'DataFrame')
+            _update_hash(h, [str(c) for c in obj.columns])
+            _update_hash(h, [str(t) for t in obj.dtypes])
+            h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+            return
+        if isinstance(obj, (pd.Series, pd.Index)):
+            h.update(type(obj).__name__.encode())
+            _update_hash(h, str(obj.dtype))
+            _update_hash(h, str(getattr(obj, 'name', None)))
+            h.update(pd.util.hash_pandas_object(obj, index=isinstance(obj, pd.Series)).values.tobytes())
+            return
+    if type(obj).__module__ == 'numpy' and hasattr(obj, 'tobytes'):
+        h.update(f'ndarray{obj.dtype.str}{getattr(obj, "shape", ())}'.encode())
+        h.update(obj.tobytes() if obj.flags.c_contiguous else obj.copy(order='C').tobytes())
+        return
+    if isinstance(obj, dict):
+        h.update(b'dict')
+        for key in sorted(obj, key=repr):
+            _update_hash(h, key)
+            _update_hash(h, obj[key])
+        return
+    if isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_hash(h, item)
+        return
+    h.update(pickle.dumps(obj, protocol=4))
+
+
+def code_hash(func):
+    """Hash of a function's qualified name and source, so style edits trigger a re-render"""
+    import inspect
+
+    name = f'{func.__module__}.{func.__qualname__}'
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = ''
+    return hashlib.sha256((name + '\n' + source).encode()).hexdigest()
+
+
+class FigureJob:
+    """One figure to render: renderer(data) -> Figure, saved to `output`"""
+
+    def __init__(self, renderer, data, output, dpi=300, fmt='png', savefig=None):
+        root, ext = os.path.splitext(output)
+        if fmt is None:
+            fmt = ext.lstrip('.') or 'png'
+        self.renderer = renderer
+        self.data = data
+        self.output = root + '.' + fmt
+        self.dpi = dpi
+        self.fmt = fmt
+        self.savefig = dict(savefig or {})
+
+    def key(self):
+        """Content hash of everything that affects the rendered file"""
+        return data_hash([code_hash(self.renderer), self.data, self.dpi, self.fmt,
+                          self.savefig])
+
+
+def _init_worker():
+    """Force the non-interactive backend in every worker process"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render_job(job):
+    """Render one job and write it to disk (runs in a worker process)"""
+    _init_worker()
+    import matplotlib.pyplot as plt
+
+    fig = job.renderer(job.data)
+    try:
+        fig.savefig(job.output, dpi=job.dpi, format=job.fmt, **job.savefig)
+    finally:
+        plt.close(fig)
+    return job.output
+
+
+def _try_render(job):
+    """Render in-process; returns None on success or the exception"""
+    try:
+        _render_job(job)
+    except Exception as e:
+        return e
+    return None
+
+
+def _result_or_error(future):
+    """Wait for a pooled render; returns None on success or the exception"""
+    try:
+        future.result()
+    except Exception as e:
+        return e
+    return None
+
+
+class FigureQueue:
+    """
+    Collects FigureJobs and renders them in parallel.
+
+    - dpi, fmt: defaults for every job (per-job overrides are allowed)
+    - max_workers: process pool size; 1 renders in-process
+    - force: re-render even when the content hash is unchanged
+    """
+
+    def __init__(self, dpi=300, fmt='png', max_workers=None, force=False):
+        self.dpi = dpi
+        self.fmt = fmt
+        self.max_workers = max_workers
+        self.force = force
+        self.jobs = []
+
+    def add(self, renderer, data, output, dpi=None, fmt=None, **savefig):
+        """Queue `renderer(data)` to be saved as `output`; returns the job"""
+        job = FigureJob(renderer, data, output,
+                        dpi=self.dpi if dpi is None else dpi,
+                        fmt=self.fmt if fmt is None else fmt,
+                        savefig=savefig)
+        self.jobs.append(job)
+        return job
+
+    def render(self):
+        """
+        Render all queued jobs whose content changed. Returns a dict mapping
+        each output path to 'rendered' or 'skipped', and clears the queue. A
+        failing figure does not stop the others from rendering, but
+        FigureRenderError is raised once they are done.
+        """
+        jobs, self.jobs = self.jobs, []
+        status = {}
+        errors = {}
+        pending = []
+        manifests = {}
+
+        for job in jobs:
+            directory = os.path.dirname(os.path.abspath(job.output))
+            manifest = manifests.setdefault(directory, _load_manifest(directory))
+            key = job.key()
+            name = os.path.basename(job.output)
+            if not self.force and manifest.get(name) == key and os.path.exists(job.output):
+                status[job.output] = 'skipped'
+                print(f"Figure unchanged, skipping '{job.output}'")
+            else:
+                pending.append((job, directory, name, key))
+
+        with stage('figures.render', rows=len(pending)):
+            if len(pending) == 1 or self.max_workers == 1:
+                results = [_try_render(job) for job, _, _, _ in pending]
+            elif pending:
+                from concurrent.futures import ProcessPoolExecutor
+
+                workers = min(self.max_workers or os.cpu_count() or 1, len(pending))
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                    futures = [pool.submit(_render_job, job) for job, _, _, _ in pending]
+                    results = [_result_or_error(future) for future in futures]
+            else:
+                results = []
+
+        for (job, directory, name, key), error in zip(pending, results):
+            if error is None:
+                manifests[directory][name] = key
+                status[job.output] = 'rendered'
+                print(f"Plot saved as '{job.output}'")
+            else:
+                manifests[directory].pop(name, None)
+                status[job.output] = 'failed'
+                errors[job.output] = error
+                print(f"Failed to render '{job.output}': {error}")
+
+        for directory, manifest in manifests.items():
+            _save_manifest(directory, manifest)
+        if errors:
+            raise FigureRenderError(errors, status)
+        return status
+
+
+def _load_manifest(directory):
+    """Read the per-directory {filename: hash} manifest of rendered figures"""
+    path = os.path.join(directory, MANIFEST)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(directory, manifest):
+    """Write the manifest back after rendering"""
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
@@ -0,0 +1,273 @@
+"""
+Incremental pipeline runner with content-addressed stage caching.
+
+A lab is described as named stages (load -> transform -> estimate -> report)
+wired into a DAG. Each stage's key is a hash of its code, its parameters
+(input files are hashed by content) and the keys of the stages it depends on,
+so the key is known before anything runs. Stage outputs are pickled under
+that key; on the next run only stages whose key changed are executed, and
+cached outputs are loaded only when a stage that has to run needs them.
+Independent branches run in parallel threads.
+
+Usage:
+    pipe = Pipeline()
+    pipe.add('load', load_gravity, params={'path': File(data)})
+    pipe.add('variables', build_variables, deps=['load'])
+    pipe.add('ols', run_ols, deps=['variables'])
+    pipe.add('report', report, deps=['ols'], cache=False)
+    pipe.run()
+
+Stage functions are called as func(*dep_outputs, **params). They must not
+mutate their inputs in a way other branches would see.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from figures import data_hash, code_hash
+from profiling import stage as profile_stage
+
+CACHE_DIR = '.pipeline_cache'
+
+
+class File:
+    """A stage parameter naming an input file; hashed by content, passed as its path"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return f'File({self.path!r})'
+
+
+class Stage:
+    """One node of the pipeline DAG"""
+
+    def __init__(self, name, func, deps=(), params=None, cache=True, code=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.params = dict(params or {})
+        self.cache = cache
+        self.code = list(code)
+
+
+class Pipeline:
+    """
+    DAG of stages with on-disk caching.
+
+    - cache_dir: where stage outputs are stored (default '.pipeline_cache')
+    - max_workers: threads used to run independent stages; 1 runs serially
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_workers=None):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.stages = {}
+        self._file_index = None
+
+    def add(self, name, func, deps=(), params=None, cache=True, code=()):
+        """
+        Add a stage. `deps` name earlier stages whose outputs are passed
+        positionally; `params` are passed as keywords (wrap input paths in
+        File). `code` lists extra functions/modules whose source should
+        invalidate the stage. Stages with cache=False always run (reports).
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage '{name}'")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = Stage(name, func, deps, params, cache, code)
+        return self
+
+    # ------------------------------------------------------------------ keys
+
+    def keys(self):
+        """Content key of every stage, computed in insertion (topological) order"""
+        keys = {}
+        for name, stage in self.stages.items():
+            params = {k: self._file_hash(v.path) if isinstance(v, File) else v
+                      for k, v in stage.params.items()}
+            code = [code_hash(stage.func)] + [_source_hash(obj) for obj in stage.code]
+            keys[name] = data_hash([name, code, params, [keys[d] for d in stage.deps]])
+        return keys
+
+    def _file_hash(self, path):
+        """sha256 of a file, memoized on (size, mtime) so large inputs hash once"""
+        if self._file_index is None:
+            self._file_index = _read_json(os.path.join(self.cache_dir, 'files.json'))
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = self._file_index.get(path)
+        if entry and entry['stamp'] == stamp:
+            return entry['sha256']
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        self._file_index[path] = {'stamp': stamp, 'sha256': h.hexdigest()}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        _write_json(os.path.join(self.cache_dir, 'files.json'), self._file_index)
+        return h.hexdigest()
+
+    # ----------------------------------------------------------------- store
+
+    def _path(self, name, key):
+        return os.path.join(self.cache_dir, f'{name}-{key[:16]}.pkl')
+
+    def _save(self, name, key, value):
+        """Persist a stage output atomically and drop older entries for the stage"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(name, key)
+        tmp = path + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        for old in glob.glob(os.path.join(glob.escape(self.cache_dir), f'{glob.escape(name)}-*.pkl')):
+            if old != path:
+                os.remove(old)
+
+    def _load(self, name, key):
+        with open(self._path(name, key), 'rb') as f:
+            return pickle.load(f)
+
+    # ------------------------------------------------------------------- run
+
+    def run(self, targets=None, force=()):
+        """
+        Run what is needed to produce `targets` and return {target: output}.
+        By default every stage is brought up to date and the outputs of the
+        final (leaf) stages are returned. `force` names stages to rerun
+        regardless of the cache (True forces all).
+        """
+        if targets is None:
+            used = {dep for stage in self.stages.values() for dep in stage.deps}
+            targets = [name for name in self.stages if name not in used]
+        needed = self._closure(targets)
+        keys = self.keys()
+
+        must_run = set()
+        for name in needed:
+            stage = self.stages[name]
+            if (force is True or name in force or not stage.cache
+                    or not os.path.exists(self._path(name, keys[name]))):
+                must_run.add(name)
+        for name in self.stages:
+            if name in needed and name not in must_run:
+                print(f"[pipeline] {name}: cached")
+
+        outputs = {}
+        locks = {name: threading.Lock() for name in needed}
+        # Outputs are dropped once every stage that reads them has run (the
+        # wide gravity frame should not outlive the panel built from it)
+        pending = {name: sum(name in self.stages[s].deps for s in must_run) for name in needed}
+        pending_lock = threading.Lock()
+
+        def store(name, value):
+            if pending[name] or name in targets:
+                outputs[name] = value
+
+        def release(name):
+            with pending_lock:
+                for dep in self.stages[name].deps:
+                    pending[dep] -= 1
+                    if pending[dep] == 0 and dep not in targets:
+                        outputs.pop(dep, None)
+
+        def get(name):
+            # Cached outputs are loaded lazily, once, by whoever needs them first
+            with locks[name]:
+                if name not in outputs:
+                    outputs[name] = self._load(name, keys[name])
+                return outputs[name]
+
+        def execute(name):
+            stage = self.stages[name]
+            args = [get(dep) for dep in stage.deps]
+            params = {k: v.path if isinstance(v, File) else v for k, v in stage.params.items()}
+            print(f"[pipeline] {name}: running")
+            start = time.perf_counter()
+            with profile_stage(f'pipeline.{name}'):
+                value = stage.func(*args, **params)
+            del args
+            release(name)
+            if stage.cache:
+                self._save(name, keys[name], value)
+            print(f"[pipeline] {name}: done in {time.perf_counter() - start:.2f}s")
+            return value
+
+        order = [name for name in self.stages if name in must_run]
+        if self.max_workers == 1:
+            for name in order:
+                store(name, execute(name))
+        else:
+            self._run_parallel(order, execute, store, must_run)
+
+        return {name: get(name) for name in targets}
+
+    def _run_parallel(self, order, execute, store, must_run):
+        """Submit each stage as soon as every dependency that has to run is done"""
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+        done = set()
+        remaining = list(order)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while remaining or running:
+                for name in list(remaining):
+                    if all(d in done or d not in must_run for d in self.stages[name].deps):
+                        remaining.remove(name)
+                        running[pool.submit(execute, name)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    store(name, future.result())
+                    done.add(name)
+
+    def _closure(self, targets):
+        """Targets plus everything they (transitively) depend on"""
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}'")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].deps)
+        return needed
+
+
+def _source_hash(obj):
+    """Hash of a function's or module's source code"""
+    import inspect
+
+    if inspect.ismodule(obj):
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = obj.__name__
+        return hashlib.sha256(source.encode()).hexdigest()
+    return code_hash(obj)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path, value):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp, path)
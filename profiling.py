@@ -0,0 +1,234 @@
+"""
+Stage timing and memory instrumentation for the lab pipelines.
+
+Off by default. Turn it on with the environment variable
+ECON2181_PROFILE=1 (or =path/prefix for the trace files), with
+`py cli.py --profile ...`, or by calling enable(). When enabled, every
+instrumented stage records wall time, CPU time, peak RSS and row count (and
+an iteration count, for solvers that set one); at exit a JSON and a CSV
+trace are written and a summary table is printed.
+
+CPU time is measured per thread (cpu_s), so stages the pipeline runs in
+parallel threads are not charged for each other's work; process_cpu_s is
+the whole process over the same interval. Peak RSS is the process's
+lifetime maximum when the stage ends, not a per-stage peak;
+peak_rss_growth_mb is how much that maximum rose during the stage.
+
+    with stage('gravity.read_stata') as s:
+        df = pd.read_stata(path)
+        s.rows = len(df)
+
+    @profiled('gravity.run_ols')
+    def run_ols(df): ...
+
+When profiling is disabled, stage() returns a shared no-op context and
+profiled functions cost one flag check per call.
+"""
+
+import atexit
+import csv
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = 'ECON2181_PROFILE'
+DEFAULT_PREFIX = 'profile_trace'
+
+_enabled = False
+_prefix = DEFAULT_PREFIX
+_records = []
+_lock = threading.Lock()
+_local = threading.local()
+_registered = False
+_t0 = time.perf_counter()
+
+
+def enable(prefix=None):
+    """Start recording; traces go to <prefix>.json / <prefix>.csv at exit"""
+    global _enabled, _prefix, _registered
+    _enabled = True
+    _prefix = prefix or DEFAULT_PREFIX
+    if not _registered:
+        atexit.register(report)
+        _registered = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def records():
+    """Copy of the stage records collected so far, in start order"""
+    with _lock:
+        return sorted(_records, key=lambda r: r['start_s'])
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        # Windows: only available through psutil
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes on Linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+class _NullStage:
+    """Returned by stage() when profiling is off; accepts and ignores .rows and .iterations"""
+    rows = None
+    iterations = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullStage()
+
+
+class _Stage:
+    """
+    One timed stage; set .rows inside the block to record a row count, and
+    .iterations for the iterations an iterative solver took
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.iterations = None
+
+    def __enter__(self):
+        depth = getattr(_local, 'depth', 0)
+        self.depth = depth
+        _local.depth = depth + 1
+        self.peak_before = peak_rss_mb()
+        self.cpu = time.thread_time()
+        self.process_cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        process_cpu = time.process_time() - self.process_cpu
+        peak = peak_rss_mb()
+        _local.depth = self.depth
+        record = {
+            'stage': self.name,
+            'start_s': round(self.wall - _t0, 6),
+            'depth': self.depth,
+            'thread': threading.current_thread().name,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'process_cpu_s': round(process_cpu, 6),
+            'peak_rss_mb': None if peak is None else round(peak, 1),
+            'peak_rss_growth_mb': (None if peak is None or self.peak_before is None
+                                   else round(peak - self.peak_before, 1)),
+            'rows': self.rows,
+            'iterations': self.iterations,
+            'error': exc_type.__name__ if exc_type else None,
+        }
+        with _lock:
+            _records.append(record)
+        return False
+
+
+def stage(name, rows=None):
+    """Context manager timing the enclosed block as stage `name`"""
+    if not _enabled:
+        return _NULL
+    return _Stage(name, rows)
+
+
+def profiled(name=None):
+    """
+    Decorator form of stage(). The row count is taken from the return value
+    when it is a DataFrame, Series or array.
+    """
+    def decorate(func):
+        label = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(label) as s:
+                result = func(*args, **kwargs)
+                if hasattr(result, 'shape') and len(result.shape):
+                    s.rows = result.shape[0]
+            return result
+        return wrapper
+    return decorate
+
+
+def summary(recs=None):
+    """Per-stage totals: calls, wall, thread CPU, process peak RSS, rows and iterations, in first-seen order"""
+    table = {}
+    for r in records() if recs is None else recs:
+        row = table.setdefault(r['stage'], {'stage': r['stage'], 'depth': r['depth'], 'calls': 0,
+                                            'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None,
+                                            'rows': None, 'iterations': None})
+        row['calls'] += 1
+        row['wall_s'] += r['wall_s']
+        row['cpu_s'] += r['cpu_s']
+        if r['peak_rss_mb'] is not None:
+            row['peak_rss_mb'] = max(row['peak_rss_mb'] or 0, r['peak_rss_mb'])
+        if r['rows'] is not None:
+            row['rows'] = (row['rows'] or 0) + r['rows']
+        if r.get('iterations') is not None:
+            row['iterations'] = (row['iterations'] or 0) + r['iterations']
+    return list(table.values())
+
+
+def format_summary(rows):
+    lines = [f"{'stage':<40} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'proc peak MB':>12} {'rows':>11}"
+             f" {'iters':>7}"]
+    for r in rows:
+        name = '  ' * r['depth'] + r['stage']
+        peak = '-' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:.0f}"
+        count = '-' if r['rows'] is None else f"{r['rows']:,}"
+        iters = '-' if r.get('iterations') is None else f"{r['iterations']:,}"
+        lines.append(f"{name:<40} {r['calls']:>5} {r['wall_s']:>9.3f} {r['cpu_s']:>9.3f} "
+                     f"{peak:>12} {count:>11} {iters:>7}")
+    return '\n'.join(lines)
+
+
+def report(prefix=None):
+    """Write <prefix>.json and <prefix>.csv and print the summary table"""
+    recs = records()
+    if not recs:
+        return
+    prefix = prefix or _prefix
+    with open(prefix + '.json', 'w') as f:
+        json.dump({'records': recs, 'summary': summary(recs)}, f, indent=2)
+    with open(prefix + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(recs[0]))
+        writer.writeheader()
+        writer.writerows(recs)
+    print("\n" + "=" * 80)
+    print("PROFILE")
+    print("=" * 80)
+    print(format_summary(summary(recs)))
+    print("cpu s is CPU time of the stage's own thread; proc peak MB is the process's peak RSS so far")
+    print(f"Trace written to {prefix}.json and {prefix}.csv")
+
+
+# Opt-in through the environment so any entry point can be profiled
+if os.environ.get(ENV_VAR, '') not in ('', '0'):
+    enable(None if os.environ[ENV_VAR] == '1' else os.environ[ENV_VAR])